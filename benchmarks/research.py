@@ -0,0 +1,268 @@
+"""End-to-end benchmark of the research pipeline against local stub servers.
+
+Runs deep_research and write_final_report over a breadth x depth x
+concurrency grid, with Firecrawl and the OpenAI API replaced by the stubs in
+benchmarks.stubs, so results only depend on this code and the
+configured latencies. Run it from the repository root:
+
+    python -m benchmarks.research --breadths 2,4 --depths 1,2 --concurrency 1,4
+"""
+
+import asyncio
+import contextlib
+import io
+import itertools
+import json
+import time
+import tracemalloc
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Tuple
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from deep_research_py import deep_research as pipeline
+from deep_research_py.ai import providers
+from deep_research_py.ai.providers import AIClientFactory
+from deep_research_py.deep_research import Firecrawl
+from deep_research_py.scheduler import ResearchScheduler
+from benchmarks.stubs import FakeFirecrawlServer, FakeOpenAIServer
+
+QUERY = "How are grid-scale battery costs changing?"
+
+
+@dataclass
+class Result:
+    """Measurements of one grid cell."""
+
+    breadth: int
+    depth: int
+    concurrency: int
+    wall_time: float
+    research_time: float
+    report_time: float
+    peak_memory: int
+    search_calls: int
+    llm_calls: int
+    failed_calls: int
+    learnings: int
+    urls: int
+    report_chars: int
+
+    @property
+    def throughput(self) -> float:
+        """Search and LLM calls answered per second."""
+        return (self.search_calls + self.llm_calls) / self.wall_time
+
+
+async def run_cell(
+    breadth: int,
+    depth: int,
+    concurrency: int,
+    search: FakeFirecrawlServer,
+    llm: FakeOpenAIServer,
+    report: bool,
+    exploration: str = "full",
+) -> Result:
+    """Run the pipeline once against freshly reset stub servers."""
+    firecrawl = Firecrawl(api_key="benchmark", api_url=await search.start())
+    client = AIClientFactory.create_client("benchmark", await llm.start())
+    pipeline.firecrawl = firecrawl
+    scheduler = ResearchScheduler(concurrency)
+
+    tracemalloc.start()
+    started = time.perf_counter()
+    started_at = datetime.now()
+    try:
+        result = await pipeline.deep_research(
+            query=QUERY,
+            breadth=breadth,
+            depth=depth,
+            concurrency=concurrency,
+            client=client,
+            model="stub",
+            scheduler=scheduler,
+            exploration=exploration,
+            started_at=started_at,
+        )
+        researched = time.perf_counter()
+        report_markdown = ""
+        if report:
+            report_markdown = await pipeline.write_final_report(
+                prompt=QUERY,
+                learnings=result["learnings"],
+                visited_urls=result["visited_urls"],
+                client=client,
+                model="stub",
+                scheduler=scheduler,
+                started_at=started_at,
+            )
+        finished = time.perf_counter()
+        _, peak_memory = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+        await firecrawl.close()
+        await client.close()
+        await search.close()
+        await llm.close()
+
+    return Result(
+        breadth=breadth,
+        depth=depth,
+        concurrency=concurrency,
+        wall_time=finished - started,
+        research_time=researched - started,
+        report_time=finished - researched,
+        peak_memory=peak_memory,
+        search_calls=search.requests,
+        llm_calls=llm.requests,
+        failed_calls=search.failures + llm.failures,
+        learnings=len(result["learnings"]),
+        urls=len(result["visited_urls"]),
+        report_chars=len(report_markdown),
+    )
+
+
+def parse_grid(value: str) -> List[int]:
+    return [int(item) for item in value.split(",") if item.strip()]
+
+
+def results_table(results: List[Result]) -> Table:
+    table = Table(title="Research benchmark")
+    for column in (
+        "Breadth",
+        "Depth",
+        "Concurrency",
+        "Wall (s)",
+        "Research (s)",
+        "Report (s)",
+        "Calls/s",
+        "Peak MB",
+        "Searches",
+        "LLM calls",
+        "Failed",
+        "Learnings",
+    ):
+        table.add_column(column, justify="right")
+    for result in results:
+        table.add_row(
+            str(result.breadth),
+            str(result.depth),
+            str(result.concurrency),
+            f"{result.wall_time:.2f}",
+            f"{result.research_time:.2f}",
+            f"{result.report_time:.2f}",
+            f"{result.throughput:.1f}",
+            f"{result.peak_memory / 1024 / 1024:.1f}",
+            str(result.search_calls),
+            str(result.llm_calls),
+            str(result.failed_calls),
+            str(result.learnings),
+        )
+    return table
+
+
+def main(
+    breadths: str = typer.Option("2,4", help="Comma-separated breadths to run"),
+    depths: str = typer.Option("1,2", help="Comma-separated depths to run"),
+    concurrency: str = typer.Option(
+        "1,4", help="Comma-separated concurrency limits to run"
+    ),
+    search_latency: float = typer.Option(0.05, help="Seconds per Firecrawl search"),
+    llm_latency: float = typer.Option(0.05, help="Seconds per LLM response"),
+    search_failure_rate: float = typer.Option(
+        0.0, help="Share of searches answered with a 500"
+    ),
+    llm_failure_rate: float = typer.Option(
+        0.0, help="Share of LLM requests answered with a 500"
+    ),
+    results: int = typer.Option(5, help="Pages returned per search"),
+    page_kb: float = typer.Option(20.0, help="Size of each page in KB"),
+    seed: int = typer.Option(0, help="Seed for the injected failures"),
+    report: bool = typer.Option(True, help="Also time write_final_report"),
+    exploration: str = typer.Option("full", help="Exploration mode: full or adaptive"),
+    warmup: bool = typer.Option(True, help="Run one untimed cell first"),
+    output: Optional[str] = typer.Option(None, help="Write the results as JSON"),
+    verbose: bool = typer.Option(False, help="Show the pipeline's own output"),
+):
+    """Benchmark deep_research offline over a breadth x depth x concurrency grid."""
+    console = Console()
+    # Every run must reach the stubs, not a cache filled by an earlier run
+    providers.set_response_cache(None)
+
+    def servers() -> Tuple[FakeFirecrawlServer, FakeOpenAIServer]:
+        search = FakeFirecrawlServer(
+            results=results,
+            page_size=int(page_kb * 1024),
+            latency=search_latency,
+            failure_rate=search_failure_rate,
+            seed=seed,
+        )
+        llm = FakeOpenAIServer(
+            latency=llm_latency, failure_rate=llm_failure_rate, seed=seed
+        )
+        return search, llm
+
+    async def benchmark() -> List[Result]:
+        if warmup:
+            # Pay for imports, encoder and connection setup outside the grid
+            with _silenced():
+                await run_cell(1, 1, 1, *servers(), report, exploration)
+
+        grid_results = []
+        for breadth, depth, limit in itertools.product(
+            parse_grid(breadths), parse_grid(depths), parse_grid(concurrency)
+        ):
+            console.print(
+                f"Running breadth {breadth}, depth {depth}, concurrency {limit}"
+            )
+            search, llm = servers()
+            quiet = contextlib.nullcontext() if verbose else _silenced()
+            with quiet:
+                grid_results.append(
+                    await run_cell(
+                        breadth, depth, limit, search, llm, report, exploration
+                    )
+                )
+        await AIClientFactory.close_clients()
+        return grid_results
+
+    grid_results = asyncio.run(benchmark())
+    console.print(results_table(grid_results))
+
+    if output:
+        settings: Dict[str, Any] = {
+            "search_latency": search_latency,
+            "llm_latency": llm_latency,
+            "search_failure_rate": search_failure_rate,
+            "llm_failure_rate": llm_failure_rate,
+            "results": results,
+            "page_kb": page_kb,
+            "seed": seed,
+            "report": report,
+            "exploration": exploration,
+            "warmup": warmup,
+        }
+        with open(output, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "settings": settings,
+                    "results": [
+                        {**asdict(result), "throughput": result.throughput}
+                        for result in grid_results
+                    ],
+                },
+                f,
+                indent=2,
+            )
+        console.print(f"Results written to {output}")
+
+
+def _silenced() -> contextlib.AbstractContextManager:
+    return contextlib.redirect_stdout(io.StringIO())
+
+
+if __name__ == "__main__":
+    typer.run(main)
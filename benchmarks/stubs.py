@@ -0,0 +1,374 @@
+"""Local stand-ins for the Firecrawl search API and an OpenAI-compatible API.
+
+Used by the benchmarks and tests to run the pipeline offline, or serve them
+with `python -m benchmarks.stubs`.
+"""
+
+import asyncio
+import itertools
+import json
+import random
+import time
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Callable, Dict, Iterable, List, Optional
+
+import typer
+from aiohttp import web
+
+
+# Vocabulary of the generated pages and learnings
+WORDS = (
+    "battery cell grid solar wind turbine storage lithium sodium cost capacity "
+    "efficiency market policy subsidy tariff demand supply forecast inverter "
+    "chemistry cathode anode recycling mining nickel cobalt price growth region "
+    "europe china india america factory output yield density cycle lifetime safety "
+    "standard certification utility consumer vehicle charging network transmission"
+).split()
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def default_completion(messages: List[Dict[str, Any]], number: int) -> str:
+    """A JSON answer with every field the research prompts ask for."""
+    rng = random.Random(number)
+    return json.dumps(
+        {
+            "queries": [
+                {"query": f"stub query {number}-{i}", "research_goal": "stub goal"}
+                for i in range(5)
+            ],
+            "questions": [f"Stub question {number}-{i}?" for i in range(3)],
+            "learnings": [_sentence(rng, 20) for _ in range(3)],
+            "followUpQuestions": [f"Stub follow-up {number}-{i}?" for i in range(3)],
+            "reportMarkdown": f"# Stub report {number}\n\nStub findings.",
+            "sectionMarkdown": f"## Stub section {number}\n\nStub findings.",
+        }
+    )
+
+
+class StubServer(ABC):
+    """Local aiohttp server on an ephemeral port, usable as an async context manager.
+
+    Args:
+        latency: Seconds to wait before answering each request
+        failure_rate: Share of requests answered with a 500, drawn from seed
+    """
+
+    # Path prefix of the API, part of the base URL given to clients
+    prefix = ""
+
+    def __init__(
+        self,
+        latency: float = 0.0,
+        failure_rate: float = 0.0,
+        seed: int = 0,
+        host: str = "127.0.0.1",
+        port: int = 0,
+    ):
+        self.latency = latency
+        self.failure_rate = failure_rate
+        self.host = host
+        self.port = port
+        self.requests = 0
+        self.failures = 0
+        self._random = random.Random(seed)
+        self._runner: Optional[web.AppRunner] = None
+
+    @property
+    def base_url(self) -> str:
+        return f"http://{self.host}:{self.port}{self.prefix}"
+
+    @abstractmethod
+    def routes(self, app: web.Application) -> None:
+        pass
+
+    async def start(self) -> str:
+        """Start serving and return the base URL for the client."""
+        app = web.Application()
+        self.routes(app)
+        self._runner = web.AppRunner(app)
+        await self._runner.setup()
+        site = web.TCPSite(self._runner, self.host, self.port)
+        await site.start()
+        self.port = site._server.sockets[0].getsockname()[1]
+        return self.base_url
+
+    async def close(self) -> None:
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
+
+    async def __aenter__(self) -> str:
+        return await self.start()
+
+    async def __aexit__(self, *exc_info: Any) -> None:
+        await self.close()
+
+    def _should_fail(self) -> bool:
+        """Count a request and decide whether it gets a random failure."""
+        self.requests += 1
+        if self.failure_rate and self._random.random() < self.failure_rate:
+            self.failures += 1
+            return True
+        return False
+
+
+class FakeFirecrawlServer(StubServer):
+    """Minimal Firecrawl search API.
+
+    Serves /v1/search with generated markdown pages whose text is derived
+    from the query, so repeated runs see the same content.
+
+    Args:
+        results: Pages returned per search, capped by the request's limit
+        page_size: Approximate size of each page's markdown in bytes
+    """
+
+    def __init__(self, results: int = 5, page_size: int = 20_000, **kwargs: Any):
+        super().__init__(**kwargs)
+        self.results = results
+        self.page_size = page_size
+        self.content_bytes = 0
+
+    def routes(self, app: web.Application) -> None:
+        app.router.add_post("/v1/search", self._search)
+
+    def page(self, query: str, index: int) -> str:
+        """Markdown of the index-th result for query."""
+        rng = random.Random(zlib.crc32(f"{query}\0{index}".encode("utf-8")))
+        paragraphs = [f"# {query.title()} ({index})"]
+        size = len(paragraphs[0])
+        while size < self.page_size:
+            paragraph = " ".join(
+                _sentence(rng, rng.randint(8, 24)) for _ in range(rng.randint(2, 6))
+            )
+            paragraphs.append(paragraph)
+            size += len(paragraph) + 2
+        return "\n\n".join(paragraphs)
+
+    async def _search(self, request: web.Request) -> web.Response:
+        body = await request.json()
+        if self._should_fail():
+            return _error(500, "Internal server error", {})
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        query = body.get("query", "")
+        data = []
+        for index in range(min(self.results, body.get("limit", self.results))):
+            markdown = self.page(query, index)
+            self.content_bytes += len(markdown)
+            slug = "-".join(query.lower().split())
+            data.append(
+                {
+                    "url": f"https://stub.example/{slug}/{index}",
+                    "title": f"{query} ({index})",
+                    "markdown": markdown,
+                }
+            )
+        return web.json_response({"success": True, "data": data})
+
+
+class FakeOpenAIServer(StubServer):
+    """Minimal OpenAI-compatible chat completions server.
+
+    Serves /v1/chat/completions, streamed or not, with optional latency, an
+    enforced requests-per-minute limit reported through x-ratelimit-*
+    headers, and scripted faults to exercise retries.
+
+    Args:
+        completion: Builds the reply text from the messages and request number
+        requests_per_minute: Reject requests over this rate with a 429
+        faults: Failures for the first requests, in order: "429", "500",
+            "timeout" (hang for hang seconds before answering) or "malformed"
+            (invalid JSON)
+        hang: Seconds a "timeout" fault stalls; give the client a shorter timeout
+    """
+
+    prefix = "/v1"
+
+    def __init__(
+        self,
+        completion: Callable[[List[Dict[str, Any]], int], str] = default_completion,
+        requests_per_minute: Optional[int] = None,
+        faults: Iterable[str] = (),
+        hang: float = 5.0,
+        **kwargs: Any,
+    ):
+        super().__init__(**kwargs)
+        self.completion = completion
+        self.hang = hang
+        self.requests_per_minute = requests_per_minute
+        self.faults = list(faults)
+        self.rejected = 0
+        self._counter = itertools.count(1)
+        self._window_start = time.monotonic()
+        self._window_requests = 0
+
+    def routes(self, app: web.Application) -> None:
+        app.router.add_post("/v1/chat/completions", self._chat_completions)
+
+    def _rate_limit_headers(self) -> Dict[str, str]:
+        """Count the request against the current minute and describe the limit."""
+        if not self.requests_per_minute:
+            return {}
+        now = time.monotonic()
+        if now - self._window_start >= 60:
+            self._window_start = now
+            self._window_requests = 0
+        self._window_requests += 1
+        reset = 60 - (now - self._window_start)
+        return {
+            "x-ratelimit-limit-requests": str(self.requests_per_minute),
+            "x-ratelimit-remaining-requests": str(
+                max(0, self.requests_per_minute - self._window_requests)
+            ),
+            "x-ratelimit-reset-requests": f"{reset:.3f}s",
+        }
+
+    async def _chat_completions(self, request: web.Request) -> web.StreamResponse:
+        body = await request.json()
+        failed = self._should_fail()
+        number = next(self._counter)
+        headers = self._rate_limit_headers()
+
+        if (
+            self.requests_per_minute
+            and self._window_requests > self.requests_per_minute
+        ):
+            self.rejected += 1
+            return _error(429, "Rate limit reached", {**headers, "retry-after": "1"})
+
+        fault = self.faults.pop(0) if self.faults else None
+        if fault == "500" or failed:
+            return _error(500, "Internal server error", headers)
+        if fault == "429":
+            self.rejected += 1
+            return _error(429, "Rate limit reached", {**headers, "retry-after": "0.1"})
+        if fault == "timeout":
+            await asyncio.sleep(self.hang)
+
+        if self.latency:
+            await asyncio.sleep(self.latency)
+
+        content = self.completion(body.get("messages", []), number)
+        if fault == "malformed":
+            content = content[: len(content) // 2]
+
+        prompt_tokens = sum(
+            len(str(message.get("content", "")).split())
+            for message in body.get("messages", [])
+        )
+        usage = {
+            "prompt_tokens": prompt_tokens,
+            "completion_tokens": len(content.split()),
+            "total_tokens": prompt_tokens + len(content.split()),
+        }
+        completion = {
+            "id": f"chatcmpl-stub-{number}",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+        }
+
+        if not body.get("stream"):
+            return web.json_response(
+                {
+                    **completion,
+                    "object": "chat.completion",
+                    "choices": [
+                        {
+                            "index": 0,
+                            "message": {"role": "assistant", "content": content},
+                            "finish_reason": "stop",
+                        }
+                    ],
+                    "usage": usage,
+                },
+                headers=headers,
+            )
+
+        response = web.StreamResponse(
+            headers={**headers, "Content-Type": "text/event-stream"}
+        )
+        await response.prepare(request)
+        words = content.split(" ")
+        for i, word in enumerate(words):
+            delta = word if i == len(words) - 1 else word + " "
+            await _send_event(
+                response,
+                {
+                    **completion,
+                    "object": "chat.completion.chunk",
+                    "choices": [
+                        {"index": 0, "delta": {"content": delta}, "finish_reason": None}
+                    ],
+                },
+            )
+        await _send_event(
+            response,
+            {
+                **completion,
+                "object": "chat.completion.chunk",
+                "choices": [],
+                "usage": usage,
+            },
+        )
+        await response.write(b"data: [DONE]\n\n")
+        await response.write_eof()
+        return response
+
+
+def _error(status: int, message: str, headers: Dict[str, str]) -> web.Response:
+    return web.json_response(
+        {"error": {"message": message, "type": "stub_error", "code": status}},
+        status=status,
+        headers=headers,
+    )
+
+
+async def _send_event(response: web.StreamResponse, data: Dict[str, Any]) -> None:
+    await response.write(f"data: {json.dumps(data)}\n\n".encode("utf-8"))
+
+
+def main(
+    port: int = typer.Option(8000, help="Port for the fake OpenAI API"),
+    latency: float = typer.Option(0.0, help="Seconds to wait before each response"),
+    requests_per_minute: int = typer.Option(
+        0, help="Reject requests over this rate with a 429 (0 for no limit)"
+    ),
+    firecrawl_port: int = typer.Option(
+        0, help="Also serve a fake Firecrawl API on this port (0 to skip)"
+    ),
+):
+    """Serve a fake OpenAI API, and optionally Firecrawl, until interrupted.
+
+    Point OPENAI_API_ENDPOINT (and FIRECRAWL_BASE_URL) at the printed URLs to
+    run the pipeline offline.
+    """
+
+    async def serve() -> None:
+        servers: List[StubServer] = [
+            FakeOpenAIServer(
+                latency=latency,
+                requests_per_minute=requests_per_minute or None,
+                port=port,
+            )
+        ]
+        if firecrawl_port:
+            servers.append(FakeFirecrawlServer(latency=latency, port=firecrawl_port))
+        try:
+            for server in servers:
+                print(f"{type(server).__name__} listening on {await server.start()}")
+            await asyncio.Event().wait()
+        finally:
+            for server in servers:
+                await server.close()
+
+    asyncio.run(serve())
+
+
+if __name__ == "__main__":
+    typer.run(main)
@@ -0,0 +1,271 @@
+"""Microbenchmarks of the text splitter and trim_prompt with a regression gate.
+
+Times RecursiveCharacterTextSplitter.split_text, merge_splits and
+trim_prompt on generated markdown from 10 KB to 10 MB, in shapes that
+stress different paths: realistic markdown, long lines without newlines,
+text with none of the separators, and many short paragraphs. Peak memory
+is measured in a separate run under tracemalloc.
+
+Timings depend on the machine, so record a baseline on the machine that
+runs the gate, then compare later runs against it:
+
+    python -m benchmarks.text --save-baseline
+    python -m benchmarks.text --threshold 0.5
+
+The comparison exits with status 1 when any case got slower or allocates
+more than the threshold allows. Without a baseline the cases are still
+measured, but the check is skipped and the exit status is 0.
+"""
+
+import base64
+import json
+import os
+import random
+import timeit
+import tracemalloc
+from dataclasses import asdict, dataclass
+from typing import Callable, Dict, List, Optional
+
+import typer
+from rich.console import Console
+from rich.table import Table
+
+from deep_research_py.ai.providers import trim_prompt
+from deep_research_py.ai.text_splitter import RecursiveCharacterTextSplitter
+from benchmarks.stubs import WORDS
+
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "text_baseline.json")
+SIZE_UNITS = {"k": 1024, "m": 1024 * 1024}
+SHAPES = ("markdown", "long_lines", "no_separators", "short_paragraphs")
+
+# Differences below these are noise, whatever the relative change
+MIN_TIME_DELTA = 0.002
+MIN_MEMORY_DELTA = 64 * 1024
+
+
+def _sentence(rng: random.Random, words: int) -> str:
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize() + "."
+
+
+def _markdown_block(rng: random.Random) -> str:
+    kind = rng.random()
+    if kind < 0.1:
+        return "## " + _sentence(rng, rng.randint(2, 6))[:-1].title()
+    if kind < 0.25:
+        return "\n".join(
+            f"- {_sentence(rng, rng.randint(3, 12))}" for _ in range(rng.randint(2, 6))
+        )
+    if kind < 0.3:
+        rows = [
+            "| " + " | ".join(rng.choice(WORDS) for _ in range(4)) + " |"
+            for _ in range(rng.randint(2, 6))
+        ]
+        return "\n".join([rows[0], "|---|---|---|---|", *rows[1:]])
+    if kind < 0.33:
+        lines = [
+            f"{rng.choice(WORDS)} = <{rng.choice(WORDS)}>({rng.randint(0, 99)})"
+            for _ in range(rng.randint(2, 8))
+        ]
+        return "```\n" + "\n".join(lines) + "\n```"
+    sentences = [_sentence(rng, rng.randint(6, 24)) for _ in range(rng.randint(2, 8))]
+    link = rng.choice(WORDS)
+    sentences.append(f"See [{link}](https://example.com/{link}).")
+    return " ".join(sentences)
+
+
+def generate(shape: str, size: int, seed: int = 0) -> str:
+    """Deterministic text of the given shape, size characters long."""
+    rng = random.Random(f"{shape}-{seed}")
+    if shape == "no_separators":
+        # Base64 has none of the splitter's separators, like inlined data
+        return base64.b64encode(rng.randbytes(size)).decode("ascii")[:size]
+
+    parts: List[str] = []
+    length = 0
+    while length < size:
+        if shape == "markdown":
+            part = _markdown_block(rng) + "\n\n"
+        elif shape == "long_lines":
+            part = _sentence(rng, rng.randint(6, 24)) + " "
+        elif shape == "short_paragraphs":
+            part = _sentence(rng, rng.randint(2, 6)) + "\n\n"
+        else:
+            raise ValueError(f"Invalid shape '{shape}'. Choose from: {SHAPES}")
+        parts.append(part)
+        length += len(part)
+    return "".join(parts)[:size]
+
+
+@dataclass
+class Measurement:
+    """Best time and peak traced memory of one case."""
+
+    seconds: float
+    peak_bytes: int
+
+
+def measure(func: Callable[[], object], repeat: int) -> Measurement:
+    """Time func, then measure its peak memory in one more call.
+
+    Like timeit, each of the repeat samples loops over func for at least
+    0.2 seconds, and the fastest per-call time counts.
+    """
+    timer = timeit.Timer(func)
+    number, _ = timer.autorange()
+    seconds = min(timer.repeat(repeat, number)) / number
+
+    tracemalloc.start()
+    try:
+        func()
+        _, peak_bytes = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+    return Measurement(seconds, peak_bytes)
+
+
+def cases(text: str) -> Dict[str, Callable[[], object]]:
+    """The benchmarked calls on text, keyed by name."""
+    splitter = RecursiveCharacterTextSplitter()
+    separator = splitter._get_separator(text)
+    # Only splits shorter than a chunk reach merge_splits from split_text
+    splits = [
+        split
+        for split in (text.split(separator) if separator else text)
+        if len(split) < splitter.chunk_size
+    ]
+    # Small enough that every size is actually trimmed, not returned as is
+    context_size = max(1, len(text) // 8)
+    return {
+        "split_text": lambda: splitter.split_text(text),
+        "merge_splits": lambda: splitter.merge_splits(splits, separator),
+        "trim_prompt": lambda: trim_prompt(text, context_size=context_size),
+    }
+
+
+def parse_size(value: str) -> int:
+    value = value.strip().lower()
+    if value and value[-1] in SIZE_UNITS:
+        return int(float(value[:-1]) * SIZE_UNITS[value[-1]])
+    return int(value)
+
+
+def format_size(size: int) -> str:
+    if size >= SIZE_UNITS["m"]:
+        return f"{size / SIZE_UNITS['m']:g}MB"
+    return f"{size / SIZE_UNITS['k']:g}KB"
+
+
+def regressions(
+    results: Dict[str, Measurement],
+    baseline: Dict[str, Measurement],
+    threshold: float,
+) -> Dict[str, str]:
+    """Describe every case that got worse than baseline by more than threshold."""
+    found = {}
+    for name, result in results.items():
+        base = baseline.get(name)
+        if base is None:
+            continue
+        problems = []
+        if (
+            result.seconds > base.seconds * (1 + threshold)
+            and result.seconds - base.seconds > MIN_TIME_DELTA
+        ):
+            problems.append(f"time +{result.seconds / base.seconds - 1:.0%}")
+        if (
+            result.peak_bytes > base.peak_bytes * (1 + threshold)
+            and result.peak_bytes - base.peak_bytes > MIN_MEMORY_DELTA
+        ):
+            problems.append(f"memory +{result.peak_bytes / base.peak_bytes - 1:.0%}")
+        if problems:
+            found[name] = ", ".join(problems)
+    return found
+
+
+def load_baseline(path: str) -> Dict[str, Measurement]:
+    with open(path, encoding="utf-8") as f:
+        data = json.load(f)
+    return {name: Measurement(**values) for name, values in data["results"].items()}
+
+
+def main(
+    sizes: str = typer.Option(
+        "10k,100k,1m,10m", help="Comma-separated input sizes, e.g. 10k,1m"
+    ),
+    shapes: str = typer.Option(",".join(SHAPES), help="Comma-separated text shapes"),
+    repeat: int = typer.Option(
+        5, help="Timed samples per case; the fastest one counts"
+    ),
+    seed: int = typer.Option(0, help="Seed for the generated corpus"),
+    baseline: str = typer.Option(DEFAULT_BASELINE, help="Baseline JSON file"),
+    save_baseline: bool = typer.Option(
+        False, help="Store the results as the new baseline instead of comparing"
+    ),
+    threshold: float = typer.Option(
+        0.5, help="Allowed slowdown or memory growth, as a fraction of the baseline"
+    ),
+):
+    """Benchmark split_text, merge_splits and trim_prompt against a baseline."""
+    console = Console()
+    previous: Optional[Dict[str, Measurement]] = None
+    if not save_baseline and os.path.exists(baseline):
+        previous = load_baseline(baseline)
+
+    results: Dict[str, Measurement] = {}
+    sizes_by_name: Dict[str, int] = {}
+    for shape in [s.strip() for s in shapes.split(",") if s.strip()]:
+        for size in [parse_size(s) for s in sizes.split(",") if s.strip()]:
+            text = generate(shape, size, seed)
+            for func, call in cases(text).items():
+                name = f"{func}/{shape}/{format_size(size)}"
+                console.print(f"Measuring {name}")
+                results[name] = measure(call, repeat)
+                sizes_by_name[name] = size
+
+    found = regressions(results, previous, threshold) if previous else {}
+
+    table = Table(title="Text benchmark")
+    for column in ("Case", "Seconds", "MB/s", "Peak MB", "Baseline s", "Regression"):
+        table.add_column(column, justify="left" if column == "Case" else "right")
+    for name, result in results.items():
+        base = previous.get(name) if previous else None
+        table.add_row(
+            name,
+            f"{result.seconds:.4f}",
+            f"{sizes_by_name[name] / SIZE_UNITS['m'] / max(result.seconds, 1e-9):.1f}",
+            f"{result.peak_bytes / SIZE_UNITS['m']:.2f}",
+            f"{base.seconds:.4f}" if base else "-",
+            f"[red]{found[name]}[/red]" if name in found else "",
+        )
+    console.print(table)
+
+    if save_baseline:
+        with open(baseline, "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "repeat": repeat,
+                    "seed": seed,
+                    "results": {
+                        name: asdict(result) for name, result in results.items()
+                    },
+                },
+                f,
+                indent=2,
+            )
+        console.print(f"Baseline written to {baseline}")
+    elif previous is None:
+        console.print(
+            f"[yellow]No baseline at {baseline}, skipped the regression check. "
+            "Record one on this machine with --save-baseline.[/yellow]"
+        )
+    elif found:
+        console.print(
+            f"[red]{len(found)} case(s) regressed by more than {threshold:.0%}[/red]"
+        )
+        raise typer.Exit(1)
+    else:
+        console.print("No regressions against the baseline")
+
+
+if __name__ == "__main__":
+    typer.run(main)
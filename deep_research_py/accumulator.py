@@ -0,0 +1,84 @@
+from dataclasses import dataclass, field
+from typing import Dict, Iterable, List, Tuple
+
+# Position of a node in the research tree, e.g. (2, 0) is the first child
+# of the third top-level query
+NodePath = Tuple[int, ...]
+
+
+@dataclass
+class Contribution:
+    """What one research node added to the run."""
+
+    path: NodePath
+    learnings: List[str] = field(default_factory=list)
+    urls: List[str] = field(default_factory=list)
+    source_urls: List[str] = field(default_factory=list)
+
+
+class ResearchAccumulator:
+    """Append-only record of the learnings and URLs found during a run.
+
+    Each node records only its own contributions, so memory grows linearly
+    with the tree. Results are deduplicated in tree order rather than in
+    completion order, which makes the output the same from run to run.
+    """
+
+    def __init__(self, learnings: Iterable[str] = (), urls: Iterable[str] = ()):
+        self._contributions: List[Contribution] = [
+            Contribution(path=(), learnings=list(learnings), urls=list(urls))
+        ]
+
+    def record(
+        self,
+        path: NodePath,
+        learnings: Iterable[str] = (),
+        urls: Iterable[str] = (),
+        source_urls: Iterable[str] = (),
+    ) -> None:
+        """Record a node's learnings, the URLs it visited and the sources
+        its learnings came from."""
+        self._contributions.append(
+            Contribution(
+                path=path,
+                learnings=list(learnings),
+                urls=list(urls),
+                source_urls=list(source_urls),
+            )
+        )
+
+    def _in_tree_order(self) -> List[Contribution]:
+        return sorted(self._contributions, key=lambda contribution: contribution.path)
+
+    @property
+    def learnings(self) -> List[str]:
+        """Unique learnings in tree order."""
+        return list(
+            dict.fromkeys(
+                learning
+                for contribution in self._in_tree_order()
+                for learning in contribution.learnings
+            )
+        )
+
+    @property
+    def urls(self) -> List[str]:
+        """Unique visited URLs in tree order."""
+        return list(
+            dict.fromkeys(
+                url
+                for contribution in self._in_tree_order()
+                for url in contribution.urls
+            )
+        )
+
+    @property
+    def learning_sources(self) -> Dict[str, List[str]]:
+        """Source URLs of each learning, in tree order."""
+        sources: Dict[str, Dict[str, None]] = {}
+        for contribution in self._in_tree_order():
+            for learning in contribution.learnings:
+                sources.setdefault(learning, {}).update(
+                    dict.fromkeys(contribution.source_urls)
+                )
+        return {learning: list(urls) for learning, urls in sources.items()}
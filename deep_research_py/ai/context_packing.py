@@ -0,0 +1,162 @@
+import math
+import re
+from collections import Counter
+from dataclasses import dataclass
+from typing import Dict, List, Set, Tuple
+
+import tiktoken
+
+from .text_splitter import RecursiveCharacterTextSplitter
+
+WORD_PATTERN = re.compile(r"\w+")
+
+
+@dataclass
+class Chunk:
+    """A paragraph-sized piece of one document."""
+
+    document: int
+    position: int
+    text: str
+    tokens: int
+    score: float = 0.0
+
+
+def _terms(text: str) -> List[str]:
+    return WORD_PATTERN.findall(text.lower())
+
+
+def _normalize(text: str) -> str:
+    """Collapse case and whitespace so copied paragraphs compare equal."""
+    return " ".join(text.lower().split())
+
+
+def bm25_scores(
+    query: str, passages: List[str], k1: float = 1.5, b: float = 0.75
+) -> List[float]:
+    """Score passages against a query with Okapi BM25."""
+    query_terms = set(_terms(query))
+    if not passages or not query_terms:
+        return [0.0] * len(passages)
+
+    passage_terms = [Counter(_terms(passage)) for passage in passages]
+    average_length = (
+        sum(sum(terms.values()) for terms in passage_terms) / len(passages) or 1.0
+    )
+
+    document_frequency: Dict[str, int] = {
+        term: sum(1 for terms in passage_terms if term in terms) for term in query_terms
+    }
+
+    scores = []
+    for terms in passage_terms:
+        length = sum(terms.values())
+        score = 0.0
+        for term in query_terms:
+            frequency = terms.get(term, 0)
+            if not frequency:
+                continue
+            df = document_frequency[term]
+            idf = math.log((len(passages) - df + 0.5) / (df + 0.5) + 1)
+            score += idf * (
+                frequency
+                * (k1 + 1)
+                / (frequency + k1 * (1 - b + b * length / average_length))
+            )
+        scores.append(score)
+    return scores
+
+
+def pack_contents(
+    query: str,
+    documents: List[str],
+    token_budget: int,
+    encoding: tiktoken.Encoding,
+    chunk_size: int = 1000,
+) -> List[str]:
+    """Fit documents into a total token budget, keeping the most relevant parts.
+
+    Documents are split into paragraph-sized chunks and paragraphs repeated
+    across pages are dropped. Each document first gets an equal share of the
+    budget, filled with its best BM25-scoring chunks, and whatever is left is
+    handed out to the best remaining chunks overall. Chunks keep their
+    original order within each document.
+
+    Args:
+        query: Query the chunks are scored against
+        documents: Document texts, e.g. search result markdown
+        token_budget: Maximum total tokens across all returned contents
+        encoding: Tokenizer used to count chunk tokens
+        chunk_size: Target chunk size in characters
+    """
+    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=0)
+
+    seen: Set[str] = set()
+    texts: List[str] = []
+    positions: List[Tuple[int, int]] = []
+    for document_index, document in enumerate(documents):
+        # Drop paragraphs already seen on this or an earlier page, which
+        # removes navigation, footers and syndicated copies
+        paragraphs = []
+        for paragraph in document.split("\n\n"):
+            key = _normalize(paragraph)
+            if key and key not in seen:
+                seen.add(key)
+                paragraphs.append(paragraph)
+
+        for position, text in enumerate(
+            splitter.iter_split_text("\n\n".join(paragraphs))
+        ):
+            texts.append(text)
+            positions.append((document_index, position))
+
+    if not texts:
+        return []
+
+    # +1 for the paragraph break each chunk is joined with
+    token_counts = [
+        len(tokens) + 1
+        for tokens in encoding.encode_batch(texts, disallowed_special=())
+    ]
+    chunks = [
+        Chunk(
+            document=document, position=position, text=text, tokens=tokens, score=score
+        )
+        for (document, position), text, tokens, score in zip(
+            positions, texts, token_counts, bm25_scores(query, texts)
+        )
+    ]
+
+    # Best chunks first, earlier chunks win ties since leads tend to matter most
+    ranked = sorted(chunks, key=lambda chunk: (-chunk.score, chunk.position))
+    selected: Set[Tuple[int, int]] = set()
+    remaining = token_budget
+
+    by_document: Dict[int, List[Chunk]] = {}
+    for chunk in ranked:
+        by_document.setdefault(chunk.document, []).append(chunk)
+
+    share = token_budget // len(by_document)
+    for document_chunks in by_document.values():
+        used = 0
+        for chunk in document_chunks:
+            if used + chunk.tokens <= share:
+                selected.add((chunk.document, chunk.position))
+                used += chunk.tokens
+        remaining -= used
+
+    for chunk in ranked:
+        key = (chunk.document, chunk.position)
+        if key not in selected and chunk.tokens <= remaining:
+            selected.add(key)
+            remaining -= chunk.tokens
+
+    packed: Dict[int, List[Chunk]] = {}
+    for chunk in chunks:
+        if (chunk.document, chunk.position) in selected:
+            packed.setdefault(chunk.document, []).append(chunk)
+
+    return [
+        "\n\n".join(chunk.text for chunk in packed[document])
+        for document in sorted(packed)
+    ]
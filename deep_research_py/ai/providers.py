@@ -1,24 +1,70 @@
+import asyncio
 import os
+import time
 import typer
 import json
+import httpx
+import openai
 from openai import AsyncOpenAI
 import tiktoken
-from typing import Optional
+from dataclasses import dataclass
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, Optional, Tuple
 from rich.console import Console
 from dotenv import load_dotenv
-from .text_splitter import RecursiveCharacterTextSplitter
+from deep_research_py.cache import Cache, create_cache, make_key
 from deep_research_py.config import EnvironmentConfig
+from deep_research_py.ai.rate_limit import backoff_delay, get_rate_limiter
+from deep_research_py.budget import current_budget
+from deep_research_py.tracing import Span, current_span, traced, tracer
 
 load_dotenv()
 
 
+# Connection pool of each long-lived LLM client
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "100"))
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "20"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "30"))
+# "auto" uses HTTP/2 when the h2 package is installed
+LLM_HTTP2 = os.getenv("LLM_HTTP2", "auto").lower()
+
+
+def _http2_enabled() -> bool:
+    if LLM_HTTP2 != "auto":
+        return LLM_HTTP2 in ("1", "true", "yes", "on")
+    try:
+        import h2  # noqa: F401
+    except ImportError:
+        return False
+    return True
+
+
 class AIClientFactory:
-    """Factory for creating AI clients for different providers."""
+    """Factory for creating AI clients for different providers.
+
+    Clients are created once per provider and reused, so every request to a
+    provider shares one pool of keep-alive connections. Call close_clients
+    on shutdown to release them.
+    """
+
+    _clients: Dict[Tuple[str, str, str], AsyncOpenAI] = {}
 
     @classmethod
     def create_client(cls, api_key: str, base_url: str) -> AsyncOpenAI:
-        """Create an AsyncOpenAI-compatible client for the specified provider."""
-        return AsyncOpenAI(api_key=api_key, base_url=base_url)
+        """Create an AsyncOpenAI-compatible client for the specified provider.
+
+        Retries are left to get_client_response, which paces them per provider.
+        """
+        http_client = openai.DefaultAsyncHttpxClient(
+            limits=httpx.Limits(
+                max_connections=LLM_MAX_CONNECTIONS,
+                max_keepalive_connections=LLM_MAX_KEEPALIVE_CONNECTIONS,
+                keepalive_expiry=LLM_KEEPALIVE_EXPIRY,
+            ),
+            http2=_http2_enabled(),
+        )
+        return AsyncOpenAI(
+            api_key=api_key, base_url=base_url, max_retries=0, http_client=http_client
+        )
 
     @classmethod
     def get_client(
@@ -26,7 +72,7 @@ class AIClientFactory:
         service_provider_name: Optional[str] = None,
         console: Optional[Console] = None,
     ) -> AsyncOpenAI:
-        """Get a configured AsyncOpenAI client using environment variables."""
+        """Get the shared AsyncOpenAI client of a provider, creating it on first use."""
         console = console or Console()
 
         try:
@@ -35,8 +81,14 @@ class AIClientFactory:
                 service_provider_name, console
             )
 
-            # Create the client
-            return cls.create_client(api_key=config.api_key, base_url=config.base_url)
+            key = (config.service_provider_name, config.base_url, config.api_key)
+            client = cls._clients.get(key)
+            if client is None or client.is_closed():
+                client = cls.create_client(
+                    api_key=config.api_key, base_url=config.base_url
+                )
+                cls._clients[key] = client
+            return client
 
         except ValueError:
             raise typer.Exit(1)
@@ -46,6 +98,14 @@ class AIClientFactory:
             )
             raise typer.Exit(1)
 
+    @classmethod
+    async def close_clients(cls) -> None:
+        """Close every shared client and its connections."""
+        clients = list(cls._clients.values())
+        cls._clients.clear()
+        for client in clients:
+            await client.close()
+
     @classmethod
     def get_model(cls, service_provider_name: Optional[str] = None) -> str:
         """Get the configured model for the specified provider."""
@@ -55,18 +115,237 @@ class AIClientFactory:
         return config.model
 
 
+@dataclass
+class TokenUsage:
+    """Running totals of the token usage reported by the provider."""
+
+    requests: int = 0
+    prompt_tokens: int = 0
+    completion_tokens: int = 0
+    cached_tokens: int = 0
+
+    def record(self, usage: Any) -> Optional["TokenUsage"]:
+        """Add the usage block of one chat completion response.
+
+        Returns the usage of that response alone.
+        """
+        if usage is None:
+            return None
+
+        # OpenAI reports prefix cache hits in prompt_tokens_details,
+        # DeepSeek in prompt_cache_hit_tokens
+        details = getattr(usage, "prompt_tokens_details", None)
+        cached = getattr(details, "cached_tokens", None) or getattr(
+            usage, "prompt_cache_hit_tokens", None
+        )
+        response_usage = TokenUsage(
+            requests=1,
+            prompt_tokens=usage.prompt_tokens or 0,
+            completion_tokens=usage.completion_tokens or 0,
+            cached_tokens=cached or 0,
+        )
+
+        self.requests += response_usage.requests
+        self.prompt_tokens += response_usage.prompt_tokens
+        self.completion_tokens += response_usage.completion_tokens
+        self.cached_tokens += response_usage.cached_tokens
+        return response_usage
+
+    def as_attributes(self) -> Dict[str, int]:
+        """Token counts for a tracing span."""
+        return {
+            "prompt_tokens": self.prompt_tokens,
+            "completion_tokens": self.completion_tokens,
+            "cached_tokens": self.cached_tokens,
+        }
+
+    @property
+    def cache_hit_rate(self) -> float:
+        """Share of prompt tokens served from the provider's prefix cache."""
+        return self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0
+
+
+token_usage = TokenUsage()
+
+
+def _charge_budget(usage: TokenUsage) -> None:
+    """Charge one response's tokens to the run budget of the calling task."""
+    budget = current_budget()
+    if budget is not None:
+        budget.record_tokens(usage.prompt_tokens, usage.completion_tokens)
+
+
+# Memoizes chat completions; LLM_CACHE selects "disk", "memory" or "off"
+response_cache: Optional[Cache] = create_cache(
+    backend=os.getenv("LLM_CACHE", "disk"),
+    path=os.getenv("LLM_CACHE_PATH", "~/.cache/deep_research_py/llm.sqlite"),
+    ttl=float(os.getenv("LLM_CACHE_TTL", str(7 * 24 * 60 * 60))),
+    max_bytes=int(os.getenv("LLM_CACHE_MAX_MB", "256")) * 1024 * 1024,
+    max_entries=int(os.getenv("LLM_CACHE_MAX_ENTRIES", "1024")),
+)
+
+
+def set_response_cache(cache: Optional[Cache]) -> None:
+    """Replace the cache used by get_client_response, or disable it with None."""
+    global response_cache
+    response_cache = cache
+
+
+def _response_cache_key(
+    client: AsyncOpenAI, model: str, messages: list, response_format: dict
+) -> str:
+    """Hash of the normalized request, so equivalent calls share an entry."""
+    normalized_messages = [
+        {"role": message["role"], "content": message["content"].strip()}
+        for message in messages
+    ]
+    return make_key(
+        "chat.completions",
+        str(client.base_url),
+        model,
+        normalized_messages,
+        response_format,
+    )
+
+
+# Retries after the first attempt for failed or malformed LLM responses
+LLM_MAX_RETRIES = int(os.getenv("LLM_MAX_RETRIES", "5"))
+
+# Transient failures worth retrying; anything else is raised right away
+RETRYABLE_ERRORS = (
+    openai.RateLimitError,
+    openai.APIConnectionError,
+    openai.InternalServerError,
+    json.JSONDecodeError,
+)
+
+
+async def _with_retries(
+    client: AsyncOpenAI,
+    messages: list,
+    request: Callable[[], Awaitable[Any]],
+    span: Any,
+) -> Any:
+    """Run request under the provider's rate limiter, retrying transient errors.
+
+    Waits for the provider's Retry-After, or backs off exponentially with
+    jitter, between attempts. A 429 also holds back every other request to
+    the same provider until the wait is over. Time spent throttled and the
+    number of retries are added to span.
+    """
+    limiter = get_rate_limiter(str(client.base_url))
+    tokens: Optional[int] = None
+
+    for attempt in range(LLM_MAX_RETRIES + 1):
+        # Counting prompt tokens is only worth it with a token limit to pace by,
+        # which rate-limit headers of an earlier attempt may have set up
+        if tokens is None and limiter.tokens is not None:
+            tokens = sum(
+                len(encoder.encode(message["content"], disallowed_special=()))
+                for message in messages
+            )
+        started = time.perf_counter()
+        await limiter.acquire(tokens or 0)
+        span.add("rate_limit_wait", time.perf_counter() - started)
+        try:
+            return await request()
+        except RETRYABLE_ERRORS as e:
+            if attempt == LLM_MAX_RETRIES:
+                raise
+            headers = getattr(getattr(e, "response", None), "headers", None)
+            delay = backoff_delay(attempt, headers)
+            if isinstance(e, openai.RateLimitError):
+                limiter.pause(delay)
+            print(f"LLM request failed ({type(e).__name__}), retrying in {delay:.1f}s")
+            span.add("retries", 1)
+            span.add("backoff_wait", delay)
+            await asyncio.sleep(delay)
+
+
+@traced("llm.request")
 async def get_client_response(
     client: AsyncOpenAI, model: str, messages: list, response_format: dict
 ):
-    response = await client.beta.chat.completions.parse(
-        model=model,
-        messages=messages,
-        response_format=response_format,
-    )
+    span = current_span()
+    span.set(model=model, cached=False)
+    cache = response_cache
+    if cache is not None:
+        cache_key = _response_cache_key(client, model, messages, response_format)
+        cached = cache.get(cache_key)
+        if cached is not None:
+            span.set(cached=True)
+            return cached
+
+    async def request() -> Any:
+        raw = await client.beta.chat.completions.with_raw_response.parse(
+            model=model,
+            messages=messages,
+            response_format=response_format,
+        )
+        get_rate_limiter(str(client.base_url)).update(raw.headers)
+        response = raw.parse()
+        usage = token_usage.record(response.usage)
+        if usage is not None:
+            span.set(**usage.as_attributes())
+            _charge_budget(usage)
+        return json.loads(response.choices[0].message.content)
+
+    result = await _with_retries(client, messages, request, span)
 
-    result = response.choices[0].message.content
+    if cache is not None:
+        cache.set(cache_key, result)
 
-    return json.loads(result)
+    return result
+
+
+async def stream_client_response(
+    client: AsyncOpenAI, model: str, messages: list
+) -> AsyncIterator[str]:
+    """Stream the text of a chat completion as it is generated."""
+    # Not the current span, the consumer runs between chunks
+    with tracer.span("llm.stream", activate=False, model=model, cached=False) as span:
+        async for chunk in _stream_client_response(client, model, messages, span):
+            yield chunk
+
+
+async def _stream_client_response(
+    client: AsyncOpenAI, model: str, messages: list, span: Span
+) -> AsyncIterator[str]:
+    cache = response_cache
+    if cache is not None:
+        cache_key = _response_cache_key(client, model, messages, {"type": "text"})
+        cached = cache.get(cache_key)
+        if cached is not None:
+            span.set(cached=True)
+            yield cached
+            return
+
+    async def request() -> Any:
+        raw = await client.chat.completions.with_raw_response.create(
+            model=model,
+            messages=messages,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        get_rate_limiter(str(client.base_url)).update(raw.headers)
+        return raw.parse()
+
+    # Only opening the stream is retried, chunks already yielded cannot be
+    stream = await _with_retries(client, messages, request, span)
+
+    parts = []
+    async for chunk in stream:
+        # The usage block arrives on a final chunk without choices
+        if chunk.usage is not None:
+            usage = token_usage.record(chunk.usage)
+            span.set(**usage.as_attributes())
+            _charge_budget(usage)
+        if chunk.choices and chunk.choices[0].delta.content:
+            parts.append(chunk.choices[0].delta.content)
+            yield chunk.choices[0].delta.content
+
+    if cache is not None:
+        cache.set(cache_key, "".join(parts))
 
 
 MIN_CHUNK_SIZE = 140
@@ -75,31 +354,47 @@ encoder = tiktoken.get_encoding(
 )  # Updated to use OpenAI's current encoding
 
 
+# Break points to snap a trimmed prompt back to, strongest first
+TRIM_BOUNDARIES = ["\n\n", "\n", ". ", " "]
+# Never give up more than this share of the kept text to reach a break point
+MAX_SNAP_FRACTION = 0.1
+
+
+@traced("trim_prompt")
 def trim_prompt(
-    prompt: str, context_size: int = int(os.getenv("CONTEXT_SIZE", "128000"))
+    prompt: str,
+    context_size: int = int(os.getenv("CONTEXT_SIZE", "128000")),
+    snap_to_boundary: bool = True,
 ) -> str:
-    """Trims a prompt to fit within the specified context size."""
+    """Trims a prompt to fit within the specified context size.
+
+    The prompt is encoded once and cut at the exact token boundary, then
+    optionally moved back to the nearest paragraph, line or sentence break.
+    """
     if not prompt:
         return ""
 
-    length = len(encoder.encode(prompt))
-    if length <= context_size:
-        return prompt
+    current_span().set(prompt_chars=len(prompt), context_size=context_size)
 
-    overflow_tokens = length - context_size
-    # Estimate characters to remove (3 chars per token on average)
-    chunk_size = len(prompt) - overflow_tokens * 3
-    if chunk_size < MIN_CHUNK_SIZE:
-        return prompt[:MIN_CHUNK_SIZE]
+    # A token is at least one UTF-8 byte, so short texts cannot overflow
+    if len(prompt) <= context_size and len(prompt.encode("utf-8")) <= context_size:
+        return prompt
 
-    splitter = RecursiveCharacterTextSplitter(chunk_size=chunk_size, chunk_overlap=0)
+    tokens = encoder.encode(prompt, disallowed_special=())
+    if len(tokens) <= context_size:
+        return prompt
 
-    trimmed_prompt = (
-        splitter.split_text(prompt)[0] if splitter.split_text(prompt) else ""
+    # Decode as bytes so a character split across tokens is dropped cleanly
+    trimmed = encoder.decode_bytes(tokens[:context_size]).decode(
+        "utf-8", errors="ignore"
     )
 
-    # Handle edge case where trimmed prompt is same length
-    if len(trimmed_prompt) == len(prompt):
-        return trim_prompt(prompt[:chunk_size], context_size)
+    if snap_to_boundary:
+        min_length = max(MIN_CHUNK_SIZE, int(len(trimmed) * (1 - MAX_SNAP_FRACTION)))
+        for boundary in TRIM_BOUNDARIES:
+            index = trimmed.rfind(boundary, min_length)
+            if index != -1:
+                # Keep the sentence punctuation but not the whitespace
+                return trimmed[: index + len(boundary.rstrip())]
 
-    return trim_prompt(trimmed_prompt, context_size)
+    return trimmed
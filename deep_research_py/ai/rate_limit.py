@@ -0,0 +1,203 @@
+import asyncio
+import os
+import random
+import re
+import time
+from email.utils import parsedate_to_datetime
+from typing import Dict, Mapping, Optional
+
+# Durations in rate-limit headers look like "1s", "6m0s", "20ms" or "1h2m3.5s"
+DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)(ms|h|m|s)")
+DURATION_UNITS = {"ms": 0.001, "s": 1.0, "m": 60.0, "h": 3600.0}
+
+
+def parse_duration(value: str) -> Optional[float]:
+    """Parse a rate-limit reset duration into seconds."""
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    matches = DURATION_PATTERN.findall(value)
+    if not matches:
+        return None
+    return sum(float(amount) * DURATION_UNITS[unit] for amount, unit in matches)
+
+
+def retry_after(headers: Optional[Mapping[str, str]]) -> Optional[float]:
+    """Seconds the server asked us to wait before retrying, if it said."""
+    if not headers:
+        return None
+
+    milliseconds = headers.get("retry-after-ms")
+    if milliseconds:
+        try:
+            return float(milliseconds) / 1000
+        except ValueError:
+            pass
+
+    value = headers.get("retry-after")
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    try:
+        return max(0.0, parsedate_to_datetime(value).timestamp() - time.time())
+    except (TypeError, ValueError):
+        return None
+
+
+def backoff_delay(
+    attempt: int,
+    headers: Optional[Mapping[str, str]] = None,
+    base: float = 1.0,
+    maximum: float = 60.0,
+) -> float:
+    """Delay before retry number attempt (starting at 0).
+
+    Honors Retry-After when the server sent it, otherwise uses exponential
+    backoff with full jitter so concurrent callers do not retry in lockstep.
+    """
+    delay = retry_after(headers)
+    if delay is not None:
+        return min(delay, maximum)
+    return random.uniform(0, min(maximum, base * 2**attempt))
+
+
+class TokenBucket:
+    """Continuously refilling bucket of capacity units per minute."""
+
+    def __init__(self, per_minute: float):
+        self.capacity = per_minute
+        self.available = per_minute
+        self._updated = time.monotonic()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.available = min(
+            self.capacity,
+            self.available + (now - self._updated) * self.capacity / 60,
+        )
+        self._updated = now
+
+    def wait_time(self, amount: float) -> float:
+        """Seconds until amount units are available."""
+        self._refill()
+        # Requests larger than the whole bucket only wait for it to fill
+        amount = min(amount, self.capacity)
+        if self.available >= amount:
+            return 0.0
+        return (amount - self.available) * 60 / self.capacity
+
+    def take(self, amount: float) -> None:
+        self._refill()
+        self.available -= amount
+
+    def sync(self, remaining: float, limit: Optional[float] = None) -> None:
+        """Adopt the limit and remaining count reported by the provider."""
+        self._refill()
+        # A lower configured limit wins over the provider's
+        if limit:
+            self.capacity = min(self.capacity, limit)
+        self.available = min(self.available, remaining)
+
+
+class RateLimiter:
+    """Client-side request and token limits for one provider.
+
+    Starts from the configured requests and tokens per minute, or no limit,
+    and adapts to the x-ratelimit-* headers of every response so requests
+    slow down before the provider starts rejecting them. A 429 pauses all
+    callers until the provider's retry window has passed.
+    """
+
+    def __init__(
+        self,
+        requests_per_minute: Optional[float] = None,
+        tokens_per_minute: Optional[float] = None,
+    ):
+        self.requests = (
+            TokenBucket(requests_per_minute) if requests_per_minute else None
+        )
+        self.tokens = TokenBucket(tokens_per_minute) if tokens_per_minute else None
+        self._paused_until = 0.0
+        self._lock: Optional[asyncio.Lock] = None
+        self._lock_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _get_lock(self) -> asyncio.Lock:
+        # Limiters outlive event loops, e.g. across asyncio.run calls
+        loop = asyncio.get_running_loop()
+        if self._lock is None or self._lock_loop is not loop:
+            self._lock = asyncio.Lock()
+            self._lock_loop = loop
+        return self._lock
+
+    async def acquire(self, tokens: int = 0) -> None:
+        """Wait until a request of about this many tokens may be sent."""
+        # Callers queue on the lock so they are admitted in arrival order
+        async with self._get_lock():
+            while True:
+                delay = max(
+                    self._paused_until - time.monotonic(),
+                    self.requests.wait_time(1) if self.requests else 0.0,
+                    self.tokens.wait_time(tokens) if self.tokens else 0.0,
+                )
+                if delay <= 0:
+                    break
+                await asyncio.sleep(delay)
+
+            if self.requests:
+                self.requests.take(1)
+            if self.tokens:
+                self.tokens.take(tokens)
+
+    def pause(self, seconds: float) -> None:
+        """Hold back every caller for the given number of seconds."""
+        self._paused_until = max(self._paused_until, time.monotonic() + seconds)
+
+    def update(self, headers: Optional[Mapping[str, str]]) -> None:
+        """Adapt the limits to the rate-limit headers of a response."""
+        if not headers:
+            return
+        for kind in ("requests", "tokens"):
+            remaining = _header_number(headers, f"x-ratelimit-remaining-{kind}")
+            if remaining is None:
+                continue
+            limit = _header_number(headers, f"x-ratelimit-limit-{kind}")
+            bucket = getattr(self, kind)
+            if bucket is None and limit:
+                bucket = TokenBucket(limit)
+                setattr(self, kind, bucket)
+            if bucket is not None:
+                bucket.sync(remaining, limit)
+            elif remaining <= 0:
+                # No known limit to pace against, wait for the reset instead
+                reset = parse_duration(headers.get(f"x-ratelimit-reset-{kind}", ""))
+                self.pause(reset or 1.0)
+
+
+def _header_number(headers: Mapping[str, str], name: str) -> Optional[float]:
+    value = headers.get(name)
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return None
+
+
+# Configured limits apply to every provider, headers refine them per provider
+LLM_REQUESTS_PER_MINUTE = float(os.environ.get("LLM_RPM", "0")) or None
+LLM_TOKENS_PER_MINUTE = float(os.environ.get("LLM_TPM", "0")) or None
+
+_rate_limiters: Dict[str, RateLimiter] = {}
+
+
+def get_rate_limiter(provider: str) -> RateLimiter:
+    """The shared rate limiter of a provider, keyed by its base URL."""
+    if provider not in _rate_limiters:
+        _rate_limiters[provider] = RateLimiter(
+            LLM_REQUESTS_PER_MINUTE, LLM_TOKENS_PER_MINUTE
+        )
+    return _rate_limiters[provider]
@@ -1,5 +1,8 @@
 from abc import ABC, abstractmethod
-from typing import List, Optional
+from collections import deque
+from typing import Deque, Iterable, Iterator, List, Optional, Tuple
+
+import tiktoken
 
 
 class TextSplitter(ABC):
@@ -16,23 +19,31 @@ class TextSplitter(ABC):
     def split_text(self, text: str) -> List[str]:
         pass
 
+    def iter_split_text(self, text: str) -> Iterator[str]:
+        """Yield chunks one at a time instead of building the whole list."""
+        yield from self.split_text(text)
+
     def create_documents(self, texts: List[str]) -> List[str]:
         documents = []
         for text in texts:
-            for chunk in self.split_text(text):
-                documents.append(chunk)
+            documents.extend(self.iter_split_text(text))
         return documents
 
     def split_documents(self, documents: List[str]) -> List[str]:
         return self.create_documents(documents)
 
-    def _join_docs(self, docs: List[str], separator: str) -> Optional[str]:
+    def _join_docs(self, docs: Iterable[str], separator: str) -> Optional[str]:
         text = separator.join(docs).strip()
         return text if text else None
 
-    def merge_splits(self, splits: List[str], separator: str) -> List[str]:
-        docs: List[str] = []
-        current_doc: List[str] = []
+    def merge_splits(self, splits: Iterable[str], separator: str) -> List[str]:
+        return list(self._iter_merge_splits(splits, separator))
+
+    def _iter_merge_splits(
+        self, splits: Iterable[str], separator: str
+    ) -> Iterator[str]:
+        """Merge splits into chunks using a sliding window over the splits."""
+        current_doc: Deque[str] = deque()
         total = 0
 
         for d in splits:
@@ -46,21 +57,19 @@ class TextSplitter(ABC):
                 if current_doc:
                     doc = self._join_docs(current_doc, separator)
                     if doc is not None:
-                        docs.append(doc)
+                        yield doc
 
                     while total > self.chunk_overlap or (
                         total + _len > self.chunk_size and total > 0
                     ):
-                        total -= len(current_doc[0])
-                        current_doc.pop(0)
+                        total -= len(current_doc.popleft())
 
             current_doc.append(d)
             total += _len
 
         doc = self._join_docs(current_doc, separator)
         if doc is not None:
-            docs.append(doc)
-        return docs
+            yield doc
 
 
 class RecursiveCharacterTextSplitter(TextSplitter):
@@ -76,9 +85,51 @@ class RecursiveCharacterTextSplitter(TextSplitter):
         self.separators = separators or ["\n\n", "\n", ".", ",", ">", "<", " ", ""]
 
     def split_text(self, text: str) -> List[str]:
-        final_chunks: List[str] = []
+        return list(self.iter_split_text(text))
+
+    def iter_split_text(self, text: str) -> Iterator[str]:
+        """Split text with an explicit stack instead of recursion.
+
+        Each stack entry holds the remaining splits of one piece of text, so
+        oversized splits are descended into in the same order as a recursive
+        walk would, without growing the call stack.
+        """
+        stack: List[Tuple[Iterator[str], str, List[str]]] = []
+        pending: Optional[str] = text
+
+        while True:
+            if pending is not None:
+                separator = self._get_separator(pending)
+                if separator:
+                    stack.append((iter(pending.split(separator)), separator, []))
+                else:
+                    # Every character is a split, so stream them straight into
+                    # the merge window instead of building a list of characters
+                    yield from self._iter_merge_splits(pending, separator)
+                pending = None
+
+            if not stack:
+                return
+
+            splits, separator, good_splits = stack[-1]
+            for s in splits:
+                if len(s) < self.chunk_size:
+                    good_splits.append(s)
+                    continue
+
+                # Oversized split: flush what we have, then descend into it
+                if good_splits:
+                    yield from self._iter_merge_splits(good_splits, separator)
+                    good_splits.clear()
+                pending = s
+                break
+            else:
+                if good_splits:
+                    yield from self._iter_merge_splits(good_splits, separator)
+                stack.pop()
 
-        # Get appropriate separator to use
+    def _get_separator(self, text: str) -> str:
+        """Get the first separator that appears in text."""
         separator = self.separators[-1]
         for s in self.separators:
             if s == "":
@@ -87,26 +138,55 @@ class RecursiveCharacterTextSplitter(TextSplitter):
             if s in text:
                 separator = s
                 break
+        return separator
 
-        # Split the text
-        splits = text.split(separator) if separator else list(text)
 
-        # Merge splits recursively
-        good_splits: List[str] = []
-        for s in splits:
-            if len(s) < self.chunk_size:
-                good_splits.append(s)
-            else:
-                if good_splits:
-                    merged_text = self.merge_splits(good_splits, separator)
-                    final_chunks.extend(merged_text)
-                    good_splits = []
-                other_info = self.split_text(s)
-                final_chunks.extend(other_info)
+class TokenTextSplitter(TextSplitter):
+    """Splits text into chunks of exactly chunk_size tokens.
 
-        if good_splits:
-            merged_text = self.merge_splits(good_splits, separator)
-            final_chunks.extend(merged_text)
+    Each text is encoded once and chunks are cut at token offsets in the
+    original string, so no chunk is re-encoded. split_texts() encodes many
+    texts in one batch using tiktoken's thread pool.
+    """
 
-        return final_chunks
+    def __init__(
+        self,
+        chunk_size: int = 1000,
+        chunk_overlap: int = 200,
+        encoding_name: str = "cl100k_base",
+        encoding: Optional[tiktoken.Encoding] = None,
+    ):
+        super().__init__(chunk_size, chunk_overlap)
+        self.encoding = encoding or tiktoken.get_encoding(encoding_name)
+
+    def split_text(self, text: str) -> List[str]:
+        return self._split_tokens(
+            text, self.encoding.encode(text, disallowed_special=())
+        )
+
+    def split_texts(self, texts: List[str]) -> List[List[str]]:
+        """Split many texts, encoding them all in a single batch."""
+        batch = self.encoding.encode_batch(texts, disallowed_special=())
+        return [self._split_tokens(text, tokens) for text, tokens in zip(texts, batch)]
+
+    def create_documents(self, texts: List[str]) -> List[str]:
+        return [chunk for chunks in self.split_texts(texts) for chunk in chunks]
+
+    def _split_tokens(self, text: str, tokens: List[int]) -> List[str]:
+        """Cut text into token windows using the character offset of each token."""
+        if len(tokens) <= self.chunk_size:
+            return [text] if text.strip() else []
+
+        _, offsets = self.encoding.decode_with_offsets(tokens)
+        step = self.chunk_size - self.chunk_overlap
+        chunks: List[str] = []
+
+        for start in range(0, len(tokens), step):
+            end = start + self.chunk_size
+            chunk = text[offsets[start] : offsets[end] if end < len(tokens) else None]
+            if chunk.strip():
+                chunks.append(chunk)
+            if end >= len(tokens):
+                break
 
+        return chunks
@@ -1,17 +1,31 @@
+import os
+from contextlib import asynccontextmanager
+from datetime import datetime
+from functools import partial
 from dotenv import load_dotenv
 import typer
 from prompt_toolkit import PromptSession
 from rich.console import Console
 from enum import Enum
-from typing import Dict, Any
+from typing import AsyncIterator, Dict, Any, Optional
 
-from deep_research_py.deep_research import deep_research, write_final_report
+from fastapi import FastAPI
+from openai import AsyncOpenAI
+
+from deep_research_py.deep_research import deep_research, firecrawl, stream_final_report
 from deep_research_py.feedback import generate_feedback
 from deep_research_py.ai.providers import AIClientFactory
+from deep_research_py.budget import RunBudget
 from deep_research_py.config import EnvironmentConfig
+from deep_research_py.jobs import Job, JobManager, JobStatus
+from deep_research_py.scheduler import ResearchScheduler
+from deep_research_py.state import conversation_id as stable_conversation_id
+from deep_research_py.state import create_state_store
 
+from whisk.config import load_config
 from whisk.kitchenai_sdk.kitchenai import KitchenAIApp
 from whisk.kitchenai_sdk.schema import ChatInput, ChatResponse
+from whisk.router import WhiskRouter
 
 load_dotenv()
 
@@ -23,6 +37,7 @@ kitchenai_app = KitchenAIApp(
     namespace="Deep Research",
 )
 
+
 class ResearchState(Enum):
     AWAITING_QUERY = "awaiting_query"
     AWAITING_BREADTH = "awaiting_breadth"
@@ -31,168 +46,326 @@ class ResearchState(Enum):
     RESEARCHING = "researching"
     COMPLETE = "complete"
 
-# Global state storage (you might want to use a proper database in production)
-conversation_states: Dict[str, Dict[str, Any]] = {}
+
+# Conversation state lives in a pluggable store, see STATE_STORE in .env.example
+conversation_store = create_state_store()
+
+
+def new_state() -> Dict[str, Any]:
+    return {
+        "state": ResearchState.AWAITING_QUERY,
+        "query": None,
+        "breadth": None,
+        "depth": None,
+        "questions": [],
+        "answers": [],
+        "current_question_idx": 0,
+        "research_results": None,
+    }
+
+
+def load_state(conversation_id: str) -> Optional[Dict[str, Any]]:
+    state_data = conversation_store.get(conversation_id)
+    if state_data is not None:
+        state_data["state"] = ResearchState(state_data["state"])
+    return state_data
+
+
+def save_state(conversation_id: str, state_data: Dict[str, Any]) -> None:
+    conversation_store.set(
+        conversation_id, {**state_data, "state": state_data["state"].value}
+    )
+
+
+# Research runs on a bounded pool of background workers. Jobs are saved to the
+# conversation store too, so with a shared store any process can report on them
+jobs = JobManager(
+    max_workers=int(os.getenv("RESEARCH_JOB_WORKERS", "2")), store=conversation_store
+)
+
+# Concurrency of each job, the CLI's --concurrency, --search-concurrency and
+# --llm-concurrency
+RESEARCH_CONCURRENCY = int(os.getenv("RESEARCH_CONCURRENCY", "4"))
+RESEARCH_SEARCH_CONCURRENCY = int(
+    os.getenv("RESEARCH_SEARCH_CONCURRENCY") or RESEARCH_CONCURRENCY
+)
+RESEARCH_LLM_CONCURRENCY = int(
+    os.getenv("RESEARCH_LLM_CONCURRENCY") or RESEARCH_CONCURRENCY
+)
+
+
+async def run_research(
+    job: Job, query: str, breadth: int, depth: int, client: AsyncOpenAI, model: str
+) -> str:
+    """Research a query and write its report, reporting progress to the job.
+
+    The job's events are ready to show: progress bullets, then the report
+    in chunks as it is generated.
+    """
+    scheduler = ResearchScheduler(
+        search_concurrency=RESEARCH_SEARCH_CONCURRENCY,
+        llm_concurrency=RESEARCH_LLM_CONCURRENCY,
+    )
+    started_at = datetime.now()
+    research_results = await deep_research(
+        query=query,
+        breadth=breadth,
+        depth=depth,
+        concurrency=RESEARCH_CONCURRENCY,
+        client=client,
+        model=model,
+        scheduler=scheduler,
+        on_progress=lambda event: job.report(f"• {event}\n"),
+        budget=RunBudget.from_env(),
+        started_at=started_at,
+    )
+
+    job.report("• Writing final report...\n")
+    parts = ["Research Complete!\n\nFinal Report:\n"]
+    job.report("\n" + parts[0])
+    async for chunk in stream_final_report(
+        prompt=query,
+        learnings=research_results["learnings"],
+        visited_urls=research_results["visited_urls"],
+        client=client,
+        model=model,
+        scheduler=scheduler,
+        skipped=research_results.get("skipped"),
+        started_at=started_at,
+    ):
+        parts.append(chunk)
+        job.report(chunk)
+
+    return "".join(parts)
+
+
+async def shutdown() -> None:
+    """Stop the research workers and close the shared HTTP connection pools."""
+    await jobs.close()
+    await firecrawl.close()
+    await AIClientFactory.close_clients()
+
+
+@asynccontextmanager
+async def lifespan(api: FastAPI) -> AsyncIterator[None]:
+    yield
+    await shutdown()
+
+
+def create_app() -> FastAPI:
+    """The Whisk server for kitchenai_app, releasing its resources on shutdown.
+
+    `whisk serve` offers no shutdown hook, so serve this factory instead:
+    uvicorn deep_research_py.app:create_app --factory
+    """
+    return WhiskRouter(
+        kitchenai_app, load_config(), fastapi_app=FastAPI(lifespan=lifespan)
+    ).app
+
 
 @kitchenai_app.chat.handler("chat.completions")
-async def main(input: ChatInput) -> ChatResponse:
+def main(input: ChatInput):
+    """Stream the reply when the client asked for it, otherwise reply in one message."""
+    if input.stream:
+        return respond(input, follow=True)
+    return respond_once(input)
+
+
+async def respond_once(input: ChatInput) -> ChatResponse:
+    """Collect the streamed reply into a single message."""
+    parts = [response.content async for response in respond(input, follow=False)]
+    return ChatResponse(content="".join(parts))
+
+
+async def respond(input: ChatInput, follow: bool) -> AsyncIterator[ChatResponse]:
+    """Advance the conversation; follow streams a running job's progress to the end."""
     # Debug logging
     print("Input metadata:", input.metadata)
-    print("Input messages:", [
-        {
-            "role": msg.role,
-            "content": msg.content[:100] + "..." if len(msg.content) > 100 else msg.content
-        } 
-        for msg in input.messages
-    ])
-    
+    print(
+        "Input messages:",
+        [
+            {
+                "role": msg.role,
+                "content": msg.content[:100] + "..."
+                if len(msg.content) > 100
+                else msg.content,
+            }
+            for msg in input.messages
+        ],
+    )
+
     # Get service and client using factory
     service = EnvironmentConfig.get_default_provider()
     client = AIClientFactory.get_client()
     model = AIClientFactory.get_model()
-    
+
     # Rest of conversation ID logic...
     conversation_id = None
     if input.metadata:
         conversation_id = input.metadata.get("conversation_id")
-    
+
     if not conversation_id and input.messages:
         conversation_text = "".join(msg.content for msg in input.messages[:1])
-        conversation_id = str(hash(conversation_text))
-    
+        conversation_id = stable_conversation_id(conversation_text)
+
     if not conversation_id:
         conversation_id = "default"
-    
+
     current_message = input.messages[-1].content if input.messages else ""
-    
+
     # Initialize or get existing state
-    if conversation_id not in conversation_states:
-        conversation_states[conversation_id] = {
-            "state": ResearchState.AWAITING_QUERY,
-            "query": None,
-            "breadth": None,
-            "depth": None,
-            "questions": [],
-            "answers": [],
-            "current_question_idx": 0,
-            "research_results": None
-        }
-        return ChatResponse(
-            content="🔍 What would you like to research?"
-        )
-    
-    state_data = conversation_states[conversation_id]
-    
+    state_data = load_state(conversation_id)
+    if state_data is None:
+        save_state(conversation_id, new_state())
+        yield ChatResponse(content="🔍 What would you like to research?")
+        return
+
+    # Save whatever the step changed, even if the client went away mid-stream
+    try:
+        async for response in advance(
+            state_data, current_message, client, model, follow
+        ):
+            yield response
+    finally:
+        save_state(conversation_id, state_data)
+
+
+async def advance(
+    state_data: Dict[str, Any],
+    current_message: str,
+    client: AsyncOpenAI,
+    model: str,
+    follow: bool,
+) -> AsyncIterator[ChatResponse]:
+    """Run one step of the research conversation, updating state_data in place."""
     # State machine for research flow
     if state_data["state"] == ResearchState.AWAITING_QUERY:
         state_data["query"] = current_message
         state_data["state"] = ResearchState.AWAITING_BREADTH
-        return ChatResponse(
-            content="📊 Research breadth (recommended 2-10) [4]: "
-        )
-        
+        yield ChatResponse(content="📊 Research breadth (recommended 2-10) [4]: ")
+        return
+
     elif state_data["state"] == ResearchState.AWAITING_BREADTH:
         try:
             state_data["breadth"] = int(current_message or "4")
             state_data["state"] = ResearchState.AWAITING_DEPTH
-            return ChatResponse(
-                content="🔍 Research depth (recommended 1-5) [2]: "
-            )
+            yield ChatResponse(content="🔍 Research depth (recommended 1-5) [2]: ")
+            return
         except ValueError:
-            return ChatResponse(
+            yield ChatResponse(
                 content="Please enter a valid number for research breadth:"
             )
-            
+            return
+
     elif state_data["state"] == ResearchState.AWAITING_DEPTH:
         try:
             state_data["depth"] = int(current_message or "2")
-            
+
             # Generate follow-up questions using factory client
-            state_data["questions"] = await generate_feedback(state_data["query"], client, model)
-            state_data["state"] = ResearchState.ASKING_QUESTIONS
-            
-            return ChatResponse(
-                content=f"[Q1] {state_data['questions'][0]}"
+            state_data["questions"] = await generate_feedback(
+                state_data["query"], client, model
             )
-            
+            state_data["state"] = ResearchState.ASKING_QUESTIONS
+
+            yield ChatResponse(content=f"[Q1] {state_data['questions'][0]}")
+            return
+
         except ValueError:
-            return ChatResponse(
+            yield ChatResponse(
                 content="Please enter a valid number for research depth:"
             )
-            
+            return
+
     elif state_data["state"] == ResearchState.ASKING_QUESTIONS:
         # Store the answer to the current question
         state_data["answers"].append(current_message)
-        
+
         # Move to next question or start research
         if len(state_data["answers"]) < len(state_data["questions"]):
             next_q_idx = len(state_data["answers"])
-            return ChatResponse(
+            yield ChatResponse(
                 content=f"[Q{next_q_idx + 1}] {state_data['questions'][next_q_idx]}"
             )
+            return
         else:
             state_data["state"] = ResearchState.RESEARCHING
-            
+
             # Combine information for research
             combined_query = f"""
-            Initial Query: {state_data['query']}
+            Initial Query: {state_data["query"]}
             Follow-up Questions and Answers:
-            {chr(10).join(f"Q: {q} A: {a}" for q, a in zip(state_data['questions'], state_data['answers']))}
+            {chr(10).join(f"Q: {q} A: {a}" for q, a in zip(state_data["questions"], state_data["answers"]))}
             """
-            
-            # Perform research using factory client
-            research_results = await deep_research(
-                query=combined_query,
-                breadth=state_data["breadth"],
-                depth=state_data["depth"],
-                concurrency=4,  # Make configurable
-                client=client,
-                model=model,
+
+            # Research runs in the background so this request returns right away
+            state_data["job_id"] = jobs.submit(
+                partial(
+                    run_research,
+                    query=combined_query,
+                    breadth=state_data["breadth"],
+                    depth=state_data["depth"],
+                    client=client,
+                    model=model,
+                )
             )
-            
-            # Generate final report
-            report = await write_final_report(
-                prompt=combined_query,
-                learnings=research_results["learnings"],
-                visited_urls=research_results["visited_urls"],
-                client=client,
-                model=model,
+            state_data["events_seen"] = 0
+            yield ChatResponse(
+                content=f"🔬 Research started (job {state_data['job_id']}). "
+                "This can take a few minutes, send any message to check on it."
             )
-            
-            # Format final response
-            final_response = f"""Research Complete!
-
-Final Report:
-{report}
+            return
 
-Sources:
-{chr(10).join(f"• {url}" for url in research_results['visited_urls'])}
-"""
-            
+    elif state_data["state"] == ResearchState.RESEARCHING:
+        job = jobs.get(state_data.get("job_id"))
+        if job is None:
             state_data["state"] = ResearchState.COMPLETE
-            return ChatResponse(
-                content=final_response
+            yield ChatResponse(
+                content="The research job was lost, please start a new research."
             )
-    
+            return
+
+        # Followers get progress and the report as they happen, pollers what
+        # happened so far and the whole report once it is done
+        start = state_data.get("events_seen", 0)
+        if follow:
+            async for event in jobs.follow(job.id, start):
+                state_data["events_seen"] += 1
+                yield ChatResponse(content=event)
+            # A job run by another process is only a snapshot, get its outcome
+            job = jobs.get(job.id) or job
+        else:
+            new_events = job.events[start:]
+            state_data["events_seen"] = start + len(new_events)
+            if not job.finished:
+                status = job.status.value
+                ahead = jobs.queue_position(job.id)
+                if ahead:
+                    status += f", {ahead} jobs ahead"
+                yield ChatResponse(
+                    content=f"⏳ Research {status}.\n" + "".join(new_events)
+                )
+                return
+
+        state_data["state"] = ResearchState.COMPLETE
+        if job.status == JobStatus.FAILED:
+            yield ChatResponse(
+                content=f"Research failed: {job.error}\n\nSend any message to start over."
+            )
+            return
+        if not follow:
+            yield ChatResponse(content=job.result)
+        return
+
     elif state_data["state"] == ResearchState.COMPLETE:
         # Reset state for new research
-        conversation_states[conversation_id] = {
-            "state": ResearchState.AWAITING_QUERY,
-            "query": None,
-            "breadth": None,
-            "depth": None,
-            "questions": [],
-            "answers": [],
-            "current_question_idx": 0,
-            "research_results": None
-        }
-        return ChatResponse(
+        state_data.clear()
+        state_data.update(new_state())
+        yield ChatResponse(
             content="Would you like to start a new research? What topic would you like to explore?"
         )
-    
+        return
+
     # Fallback response
-    return ChatResponse(
+    yield ChatResponse(
         content="I'm sorry, something went wrong. Let's start over. What would you like to research?"
     )
-
-
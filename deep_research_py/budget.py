@@ -0,0 +1,188 @@
+import math
+import os
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, Optional, Tuple
+
+# Assumed cost of one node until the first one finishes: a search, and an
+# extraction over a full search-content budget (see SERP_TOKEN_BUDGET)
+DEFAULT_NODE_COST = {
+    "input tokens": 25_000,
+    "output tokens": 1_000,
+    "search calls": 1,
+    "seconds": 30,
+}
+
+
+class RunBudget:
+    """Limits on what the research phase of one run may spend.
+
+    Each limit is optional. LLM tokens and searches are charged to the
+    budget that is active in the calling task (see active), so concurrent
+    runs in one process keep separate totals. Report writing is not
+    charged; the budget decides how much research feeds it.
+    """
+
+    def __init__(
+        self,
+        max_input_tokens: Optional[int] = None,
+        max_output_tokens: Optional[int] = None,
+        max_search_calls: Optional[int] = None,
+        max_seconds: Optional[float] = None,
+    ):
+        self.max_input_tokens = max_input_tokens
+        self.max_output_tokens = max_output_tokens
+        self.max_search_calls = max_search_calls
+        self.max_seconds = max_seconds
+        self.input_tokens = 0
+        self.output_tokens = 0
+        self.search_calls = 0
+        # Nodes researched so far, and nodes queued but not yet started
+        self.nodes = 0
+        self.pending = 0
+        self.skipped: List[str] = []
+        self._started: Optional[float] = None
+
+    @classmethod
+    def from_env(
+        cls,
+        max_input_tokens: Optional[int] = None,
+        max_output_tokens: Optional[int] = None,
+        max_search_calls: Optional[int] = None,
+        max_seconds: Optional[float] = None,
+    ) -> "RunBudget":
+        """Limits given here, or else from the RESEARCH_MAX_* variables."""
+
+        def env(name: str, convert: type) -> Optional[float]:
+            value = os.getenv(name)
+            return convert(value) if value else None
+
+        return cls(
+            max_input_tokens=max_input_tokens or env("RESEARCH_MAX_INPUT_TOKENS", int),
+            max_output_tokens=max_output_tokens
+            or env("RESEARCH_MAX_OUTPUT_TOKENS", int),
+            max_search_calls=max_search_calls or env("RESEARCH_MAX_SEARCHES", int),
+            max_seconds=max_seconds or env("RESEARCH_MAX_SECONDS", float),
+        )
+
+    @property
+    def limited(self) -> bool:
+        return any(
+            limit is not None
+            for limit in (
+                self.max_input_tokens,
+                self.max_output_tokens,
+                self.max_search_calls,
+                self.max_seconds,
+            )
+        )
+
+    @property
+    def elapsed(self) -> float:
+        return time.monotonic() - self._started if self._started is not None else 0.0
+
+    def start(self) -> None:
+        """Start the clock, unless an earlier call already did."""
+        if self._started is None:
+            self._started = time.monotonic()
+
+    @contextmanager
+    def active(self) -> Iterator["RunBudget"]:
+        """Charge the LLM usage and searches of the block to this budget."""
+        token = _current_budget.set(self)
+        try:
+            yield self
+        finally:
+            _current_budget.reset(token)
+
+    def snapshot(self) -> Dict[str, float]:
+        """What has been spent so far, for restore in a resumed run."""
+        return {
+            "input_tokens": self.input_tokens,
+            "output_tokens": self.output_tokens,
+            "search_calls": self.search_calls,
+            "seconds": self.elapsed,
+            "nodes": self.nodes,
+        }
+
+    def restore(self, snapshot: Dict[str, float]) -> None:
+        """Add the spending of an interrupted run to this budget."""
+        self.input_tokens += int(snapshot.get("input_tokens", 0))
+        self.output_tokens += int(snapshot.get("output_tokens", 0))
+        self.search_calls += int(snapshot.get("search_calls", 0))
+        self.nodes += int(snapshot.get("nodes", 0))
+        self.start()
+        self._started -= snapshot.get("seconds", 0.0)
+
+    def record_tokens(self, input_tokens: int, output_tokens: int) -> None:
+        self.input_tokens += input_tokens
+        self.output_tokens += output_tokens
+
+    def record_search(self) -> None:
+        self.search_calls += 1
+
+    def skip(self, description: str) -> None:
+        """Note research left out because of the budget, for the report."""
+        self.skipped.append(description)
+
+    def _usage(self) -> List[Tuple[str, float, float]]:
+        """(name, spent, limit) of every configured limit."""
+        usage = [
+            ("input tokens", self.input_tokens, self.max_input_tokens),
+            ("output tokens", self.output_tokens, self.max_output_tokens),
+            ("search calls", self.search_calls, self.max_search_calls),
+            ("seconds", self.elapsed, self.max_seconds),
+        ]
+        return [(name, spent, limit) for name, spent, limit in usage if limit]
+
+    def exhausted(self) -> Optional[str]:
+        """Describe the first limit that has been reached, if any."""
+        for name, spent, limit in self._usage():
+            if spent >= limit:
+                return f"{name} budget of {limit:,.0f} reached"
+        return None
+
+    def nodes_left(self) -> Optional[int]:
+        """How many more nodes can be scheduled, beyond those already queued.
+
+        Estimated from the average cost of the nodes researched so far, or
+        from DEFAULT_NODE_COST before any node has finished. None while no
+        limit is set.
+        """
+        if self.nodes:
+            estimates = [
+                (limit - spent) / (spent / self.nodes)
+                for _, spent, limit in self._usage()
+                if spent > 0
+            ]
+        else:
+            estimates = [
+                (limit - spent) / DEFAULT_NODE_COST[name]
+                for name, spent, limit in self._usage()
+            ]
+        if not estimates:
+            return None
+        return max(0, math.floor(min(estimates)) - self.pending)
+
+    def fit_breadth(self, breadth: int) -> int:
+        """The number of children a node can afford to queue, at most breadth."""
+        left = self.nodes_left()
+        return breadth if left is None else min(breadth, left)
+
+    def summary(self) -> str:
+        """Spending against each limit, e.g. for the report."""
+        return ", ".join(
+            f"{spent:,.0f} of {limit:,.0f} {name}"
+            for name, spent, limit in self._usage()
+        )
+
+
+_current_budget: ContextVar[Optional[RunBudget]] = ContextVar(
+    "current_budget", default=None
+)
+
+
+def current_budget() -> Optional[RunBudget]:
+    """The budget charged for work in this task, if any."""
+    return _current_budget.get()
@@ -0,0 +1,267 @@
+import hashlib
+import json
+import math
+import os
+import sqlite3
+import threading
+import time
+import zlib
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Any, Dict, Optional, Tuple
+
+
+def make_key(*parts: Any) -> str:
+    """Build a content-addressed cache key from JSON-serializable parts."""
+    payload = json.dumps(parts, sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+
+class Cache(ABC):
+    """Base key/value cache that records hit and miss counts."""
+
+    def __init__(self, ttl: Optional[float] = None):
+        self.ttl = ttl
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: str) -> Optional[Any]:
+        """Return the cached value, or None if missing or expired."""
+        value = self._get(key)
+        if value is None:
+            self.misses += 1
+        else:
+            self.hits += 1
+        return value
+
+    def set(self, key: str, value: Any) -> None:
+        """Store a JSON-serializable value."""
+        self._set(key, value)
+
+    def stats(self) -> Dict[str, float]:
+        """Hit and miss counts since the cache was created."""
+        lookups = self.hits + self.misses
+        return {
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+    @abstractmethod
+    def _get(self, key: str) -> Optional[Any]:
+        pass
+
+    @abstractmethod
+    def _set(self, key: str, value: Any) -> None:
+        pass
+
+    @abstractmethod
+    def clear(self) -> None:
+        pass
+
+
+class MemoryCache(Cache):
+    """In-process LRU cache with TTL and a maximum number of entries.
+
+    Values are kept as serialized JSON so callers always get a fresh copy.
+    """
+
+    def __init__(self, ttl: Optional[float] = None, max_entries: int = 1024):
+        super().__init__(ttl)
+        self.max_entries = max_entries
+        self._entries: OrderedDict[str, Tuple[float, str]] = OrderedDict()
+        self._lock = threading.Lock()
+
+    def _get(self, key: str) -> Optional[Any]:
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+
+            created_at, value = entry
+            if self.ttl is not None and time.time() - created_at > self.ttl:
+                del self._entries[key]
+                return None
+
+            self._entries.move_to_end(key)
+        return json.loads(value)
+
+    def _set(self, key: str, value: Any) -> None:
+        with self._lock:
+            self._entries[key] = (time.time(), json.dumps(value))
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._entries.clear()
+
+
+class SQLiteCache(Cache):
+    """Disk-backed key/value cache with TTL and size-bounded LRU eviction.
+
+    Values are stored as zlib-compressed JSON. When the total stored size
+    goes past max_bytes, the least recently used entries are evicted. The
+    database file is only created on first use, so caches can be set up at
+    import time without touching the disk.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ttl: Optional[float] = 24 * 60 * 60,
+        max_bytes: int = 256 * 1024 * 1024,
+    ):
+        super().__init__(ttl)
+        self.path = os.path.expanduser(path)
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self._connection: Optional[sqlite3.Connection] = None
+
+    @property
+    def _conn(self) -> sqlite3.Connection:
+        """Get the database connection, creating the database on first use."""
+        if self._connection is None:
+            directory = os.path.dirname(self.path)
+            if directory:
+                os.makedirs(directory, exist_ok=True)
+
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """CREATE TABLE IF NOT EXISTS cache (
+                    key TEXT PRIMARY KEY,
+                    value BLOB NOT NULL,
+                    size INTEGER NOT NULL,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL
+                )"""
+            )
+            conn.execute(
+                "CREATE INDEX IF NOT EXISTS cache_accessed_at ON cache (accessed_at)"
+            )
+            conn.commit()
+            self._connection = conn
+        return self._connection
+
+    def _get(self, key: str) -> Optional[Any]:
+        now = time.time()
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value, created_at FROM cache WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                return None
+
+            value, created_at = row
+            if self.ttl is not None and now - created_at > self.ttl:
+                self._conn.execute("DELETE FROM cache WHERE key = ?", (key,))
+                self._conn.commit()
+                return None
+
+            self._conn.execute(
+                "UPDATE cache SET accessed_at = ? WHERE key = ?", (now, key)
+            )
+            self._conn.commit()
+
+        return json.loads(zlib.decompress(value))
+
+    def _set(self, key: str, value: Any) -> None:
+        blob = zlib.compress(json.dumps(value).encode("utf-8"))
+        now = time.time()
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO cache (key, value, size, created_at, accessed_at) "
+                "VALUES (?, ?, ?, ?, ?)",
+                (key, blob, len(blob), now, now),
+            )
+            self._evict(now)
+            self._conn.commit()
+
+    def _evict(self, now: float) -> None:
+        """Drop expired entries, then least recently used ones over max_bytes."""
+        if self.ttl is not None:
+            self._conn.execute(
+                "DELETE FROM cache WHERE created_at < ?", (now - self.ttl,)
+            )
+
+        (total,) = self._conn.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM cache"
+        ).fetchone()
+        if total <= self.max_bytes:
+            return
+
+        rows = self._conn.execute(
+            "SELECT key, size FROM cache ORDER BY accessed_at ASC"
+        ).fetchall()
+        stale_keys = []
+        for key, size in rows:
+            if total <= self.max_bytes:
+                break
+            stale_keys.append((key,))
+            total -= size
+        self._conn.executemany("DELETE FROM cache WHERE key = ?", stale_keys)
+
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._conn.execute("DELETE FROM cache")
+            self._conn.commit()
+
+    def close(self) -> None:
+        """Close the underlying database connection."""
+        with self._lock:
+            if self._connection is not None:
+                self._connection.close()
+                self._connection = None
+
+
+class RedisCache(Cache):
+    """Cache kept in a Redis server, shared by every process connected to it.
+
+    Works with any client that has Redis' get, set (with ex), scan_iter and
+    delete methods, such as redis.Redis or an in-memory stand-in.
+    """
+
+    def __init__(self, client: Any, ttl: Optional[float] = None, prefix: str = ""):
+        super().__init__(ttl)
+        self.client = client
+        self.prefix = prefix
+
+    def _get(self, key: str) -> Optional[Any]:
+        value = self.client.get(self.prefix + key)
+        if value is None:
+            return None
+        return json.loads(value)
+
+    def _set(self, key: str, value: Any) -> None:
+        # Redis expires entries itself, in whole seconds
+        expiry = math.ceil(self.ttl) if self.ttl is not None else None
+        self.client.set(self.prefix + key, json.dumps(value), ex=expiry)
+
+    def clear(self) -> None:
+        """Remove every entry under this cache's prefix."""
+        for key in self.client.scan_iter(match=self.prefix + "*"):
+            self.client.delete(key)
+
+
+def create_cache(
+    backend: str,
+    path: str,
+    ttl: Optional[float] = None,
+    max_bytes: int = 256 * 1024 * 1024,
+    max_entries: int = 1024,
+) -> Optional[Cache]:
+    """Create a cache for the given backend name ("memory", "disk" or "off")."""
+    backend = backend.lower()
+    if backend == "off":
+        return None
+    if backend == "memory":
+        return MemoryCache(ttl=ttl, max_entries=max_entries)
+    if backend == "disk":
+        return SQLiteCache(path=path, ttl=ttl, max_bytes=max_bytes)
+    raise ValueError(
+        f"Invalid cache backend '{backend}'. Choose from: memory, disk, off"
+    )
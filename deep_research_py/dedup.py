@@ -0,0 +1,336 @@
+import asyncio
+import math
+import re
+import zlib
+from collections import Counter
+from typing import Dict, FrozenSet, Iterator, List, Optional, Set, Tuple
+
+WORD_PATTERN = re.compile(r"\w+")
+# Numbers, including years, decimals and thousands separators
+NUMBER_PATTERN = re.compile(r"\d+(?:[.,]\d+)*")
+
+
+def shingles(text: str, size: int = 5) -> FrozenSet[int]:
+    """Hash every run of `size` consecutive words in text."""
+    words = WORD_PATTERN.findall(text.lower())
+    if not words:
+        return frozenset()
+    if len(words) < size:
+        return frozenset([zlib.crc32(" ".join(words).encode("utf-8"))])
+    return frozenset(
+        zlib.crc32(" ".join(words[i : i + size]).encode("utf-8"))
+        for i in range(len(words) - size + 1)
+    )
+
+
+class MinHash:
+    """Fixed-length MinHash signature of a shingle set.
+
+    Uses one-permutation hashing: every shingle hash falls into one of
+    num_hashes bins, and each bin keeps its smallest value. This costs one
+    pass over the shingles, yet two signatures still estimate the Jaccard
+    similarity of their sets, and equal runs of bins make LSH band keys.
+    """
+
+    # Value of a bin that no shingle fell into
+    EMPTY = 1 << 32
+
+    def __init__(self, shingle_hashes: FrozenSet[int], num_hashes: int = 128):
+        self.num_hashes = num_hashes
+        signature = [self.EMPTY] * num_hashes
+        for h in shingle_hashes:
+            slot, value = h % num_hashes, h // num_hashes
+            if value < signature[slot]:
+                signature[slot] = value
+        self.signature: Tuple[int, ...] = tuple(signature)
+
+    def jaccard(self, other: "MinHash") -> float:
+        """Estimate the Jaccard similarity of the two underlying sets."""
+        equal = empty = 0
+        for a, b in zip(self.signature, other.signature):
+            if a == b:
+                if a == self.EMPTY:
+                    empty += 1
+                else:
+                    equal += 1
+        filled = len(self.signature) - empty
+        return equal / filled if filled else 0.0
+
+    def bands(self, rows: int) -> Iterator[Tuple[int, Tuple[int, ...]]]:
+        """(band number, bins) of every band that holds a shingle."""
+        for band, start in enumerate(range(0, self.num_hashes, rows)):
+            bins = self.signature[start : start + rows]
+            if any(value != self.EMPTY for value in bins):
+                yield band, bins
+
+
+class NearDuplicateIndex:
+    """Remembers documents seen during a run and flags near-duplicates.
+
+    A document is a near-duplicate when the estimated Jaccard similarity of
+    its word shingles with an indexed document reaches the threshold, which
+    catches syndicated copies and mirrors that differ only in boilerplate.
+    Signatures are bucketed by LSH bands of `rows` bins, so a new document
+    is only compared with the documents it shares a band with. With the
+    defaults, pairs more than about 0.6 similar share a band almost surely.
+    """
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        num_hashes: int = 128,
+        shingle_size: int = 5,
+        rows: int = 4,
+    ):
+        self.threshold = threshold
+        self.num_hashes = num_hashes
+        self.shingle_size = shingle_size
+        self.rows = rows
+        self._sketches: Dict[str, MinHash] = {}
+        self._buckets: Dict[Tuple[int, Tuple[int, ...]], Set[str]] = {}
+        self.duplicates = 0
+        self.duplicate_chars = 0
+
+    def sketch(self, text: str) -> MinHash:
+        """Signature of text, safe to compute outside the event loop."""
+        return MinHash(shingles(text, self.shingle_size), self.num_hashes)
+
+    def add(
+        self, key: str, text: str, sketch: Optional[MinHash] = None
+    ) -> Optional[str]:
+        """Index text under key unless it duplicates an indexed document.
+
+        Returns the key of the matching document for duplicates, else None.
+        """
+        sketch = sketch or self.sketch(text)
+        match = self._find(sketch)
+        if match is not None:
+            self.duplicates += 1
+            self.duplicate_chars += len(text)
+            return match
+
+        self.remove(key)
+        self._sketches[key] = sketch
+        for band in sketch.bands(self.rows):
+            self._buckets.setdefault(band, set()).add(key)
+        return None
+
+    def remove(self, key: str) -> None:
+        """Forget the document indexed under key, if any."""
+        sketch = self._sketches.pop(key, None)
+        if sketch is None:
+            return
+        for band in sketch.bands(self.rows):
+            bucket = self._buckets[band]
+            bucket.discard(key)
+            if not bucket:
+                del self._buckets[band]
+
+    def _find(self, sketch: MinHash) -> Optional[str]:
+        candidates: Set[str] = set()
+        for band in sketch.bands(self.rows):
+            candidates.update(self._buckets.get(band, ()))
+        for key in candidates:
+            if sketch.jaccard(self._sketches[key]) >= self.threshold:
+                return key
+        return None
+
+    def __len__(self) -> int:
+        return len(self._sketches)
+
+
+async def drop_near_duplicates(
+    items: List[Dict[str, str]], index: NearDuplicateIndex
+) -> List[Dict[str, str]]:
+    """Keep the search results whose markdown is not a near-duplicate.
+
+    Pages are fingerprinted in a worker thread so large pages do not block
+    the event loop. The kept results are indexed under their URL; remove
+    them again with forget_documents if they end up not being processed.
+    """
+    sketches = await asyncio.to_thread(
+        lambda: [
+            index.sketch(item["markdown"]) if item.get("markdown") else None
+            for item in items
+        ]
+    )
+    kept = []
+    for item, sketch in zip(items, sketches):
+        if sketch is None:
+            kept.append(item)
+            continue
+
+        match = index.add(item.get("url") or str(len(index)), item["markdown"], sketch)
+        if match is None:
+            kept.append(item)
+        else:
+            print(f"Skipping near-duplicate of {match}: {item.get('url')}")
+    return kept
+
+
+def forget_documents(items: List[Dict[str, str]], index: NearDuplicateIndex) -> None:
+    """Remove search results added by drop_near_duplicates from index."""
+    for item in items:
+        if item.get("url"):
+            index.remove(item["url"])
+
+
+# Words that carry no meaning on their own and only dilute similarity
+STOP_WORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the "
+    "this to was were will with".split()
+)
+
+
+def _tfidf_vectors(texts: List[str]) -> List[Dict[str, float]]:
+    """Unit-length TF-IDF vectors over the words of each text."""
+    term_counts = [
+        Counter(w for w in WORD_PATTERN.findall(text.lower()) if w not in STOP_WORDS)
+        for text in texts
+    ]
+    document_frequency = Counter(term for counts in term_counts for term in counts)
+
+    vectors = []
+    for counts in term_counts:
+        vector = {
+            term: count
+            * (math.log((1 + len(texts)) / (1 + document_frequency[term])) + 1)
+            for term, count in counts.items()
+        }
+        norm = math.sqrt(sum(weight * weight for weight in vector.values())) or 1.0
+        vectors.append({term: weight / norm for term, weight in vector.items()})
+    return vectors
+
+
+def _cosine(a: Dict[str, float], b: Dict[str, float]) -> float:
+    if len(a) > len(b):
+        a, b = b, a
+    return sum(weight * b.get(term, 0.0) for term, weight in a.items())
+
+
+def _numbers(text: str) -> FrozenSet[str]:
+    return frozenset(number.replace(",", "") for number in NUMBER_PATTERN.findall(text))
+
+
+def merge_similar_learnings(
+    learnings: List[str],
+    learning_sources: Optional[Dict[str, List[str]]] = None,
+    threshold: float = 0.85,
+) -> Tuple[List[str], Dict[str, List[str]]]:
+    """Collapse paraphrased learnings into one representative each.
+
+    Learnings are compared by the cosine similarity of their TF-IDF vectors
+    and greedily clustered in order. Learnings that mention different
+    numbers or years state different facts and are never merged, however
+    similar their wording. The longest learning of each cluster is kept,
+    along with the union of the source URLs of all its members.
+
+    Returns:
+        The representative learnings in order of first appearance, and the
+        source URLs of each representative.
+    """
+    learning_sources = learning_sources or {}
+    vectors = _tfidf_vectors(learnings)
+    numbers = [_numbers(learning) for learning in learnings]
+
+    # Each cluster is the list of indexes of its members, first member leads
+    clusters: List[List[int]] = []
+    for index, vector in enumerate(vectors):
+        for cluster in clusters:
+            if (
+                numbers[index] == numbers[cluster[0]]
+                and _cosine(vector, vectors[cluster[0]]) >= threshold
+            ):
+                cluster.append(index)
+                break
+        else:
+            clusters.append([index])
+
+    merged: List[str] = []
+    merged_sources: Dict[str, List[str]] = {}
+    for cluster in clusters:
+        representative = max((learnings[i] for i in cluster), key=len)
+        sources = dict.fromkeys(
+            url for i in cluster for url in learning_sources.get(learnings[i], [])
+        )
+        merged.append(representative)
+        merged_sources[representative] = list(sources)
+
+    return merged, merged_sources
+
+
+def _centroid(vectors: List[Dict[str, float]]) -> Dict[str, float]:
+    total: Dict[str, float] = {}
+    for vector in vectors:
+        for term, weight in vector.items():
+            total[term] = total.get(term, 0.0) + weight
+    norm = math.sqrt(sum(weight * weight for weight in total.values())) or 1.0
+    return {term: weight / norm for term, weight in total.items()}
+
+
+def cluster_by_topic(
+    texts: List[str], sizes: List[int], max_size: int, iterations: int = 5
+) -> List[List[int]]:
+    """Group texts by topic so that no group is larger than max_size.
+
+    Runs spherical k-means over TF-IDF vectors with just enough clusters
+    for the total size, seeded farthest-first so the result is
+    deterministic. Clusters that still exceed max_size are split in order.
+    A single text larger than max_size gets a group of its own.
+
+    Returns:
+        Groups of text indexes, in order of each group's first text.
+    """
+    if not texts:
+        return []
+
+    k = min(len(texts), max(1, math.ceil(sum(sizes) / max_size)))
+    if k == 1:
+        return [list(range(len(texts)))]
+
+    vectors = _tfidf_vectors(texts)
+
+    # Farthest-first seeding: each seed is the text least similar to the others
+    centroids = [vectors[0]]
+    closest = [_cosine(vector, centroids[0]) for vector in vectors]
+    while len(centroids) < k:
+        seed = min(range(len(vectors)), key=lambda i: closest[i])
+        centroids.append(vectors[seed])
+        closest = [
+            max(similarity, _cosine(vector, vectors[seed]))
+            for similarity, vector in zip(closest, vectors)
+        ]
+
+    assignments: List[int] = []
+    for _ in range(iterations):
+        updated = [
+            max(range(k), key=lambda c: _cosine(vector, centroids[c]))
+            for vector in vectors
+        ]
+        if updated == assignments:
+            break
+        assignments = updated
+        members: List[List[Dict[str, float]]] = [[] for _ in range(k)]
+        for vector, cluster in zip(vectors, assignments):
+            members[cluster].append(vector)
+        centroids = [
+            _centroid(cluster_vectors) if cluster_vectors else centroids[c]
+            for c, cluster_vectors in enumerate(members)
+        ]
+
+    clusters: Dict[int, List[int]] = {}
+    for index, cluster in enumerate(assignments):
+        clusters.setdefault(cluster, []).append(index)
+
+    groups: List[List[int]] = []
+    for indexes in sorted(clusters.values()):
+        group: List[int] = []
+        used = 0
+        for index in indexes:
+            if group and used + sizes[index] > max_size:
+                groups.append(group)
+                group, used = [], 0
+            group.append(index)
+            used += sizes[index]
+        groups.append(group)
+    return groups
@@ -1,11 +1,43 @@
-from typing import List, Dict, TypedDict, Optional
-from dataclasses import dataclass
+from typing import (
+    Any,
+    AsyncIterator,
+    Callable,
+    List,
+    Dict,
+    NotRequired,
+    TypedDict,
+    Optional,
+)
+from dataclasses import asdict, dataclass, field
+from datetime import datetime
 import asyncio
+import math
 import os
+import aiohttp
 import openai
 from firecrawl import FirecrawlApp
-from .ai.providers import trim_prompt, get_client_response
+from .ai.providers import (
+    encoder,
+    trim_prompt,
+    get_client_response,
+    stream_client_response,
+)
+from .ai.context_packing import pack_contents
+from .accumulator import NodePath, ResearchAccumulator
+from .budget import RunBudget, current_budget
+from .cache import Cache, SQLiteCache, make_key
+from .journal import ResearchJournal
+from .dedup import (
+    NearDuplicateIndex,
+    cluster_by_topic,
+    drop_near_duplicates,
+    forget_documents,
+    merge_similar_learnings,
+)
+from .url_index import UrlIndex
 from .prompt import system_prompt
+from .scheduler import ResearchScheduler
+from .tracing import current_span, traced
 import json
 
 
@@ -16,6 +48,10 @@ class SearchResponse(TypedDict):
 class ResearchResult(TypedDict):
     learnings: List[str]
     visited_urls: List[str]
+    # Source URLs of each learning, when known
+    learning_sources: NotRequired[Dict[str, List[str]]]
+    # Research left out to stay within the run's budget
+    skipped: NotRequired[List[str]]
 
 
 @dataclass
@@ -24,59 +60,177 @@ class SerpQuery:
     research_goal: str
 
 
+DEFAULT_FIRECRAWL_URL = "https://api.firecrawl.dev"
+
+
+def _content_attributes(result: SearchResponse) -> Dict[str, int]:
+    """Size of a search response, for its tracing span."""
+    return {
+        "results": len(result["data"]),
+        "content_bytes": sum(
+            len((item.get("markdown") or "").encode("utf-8")) for item in result["data"]
+        ),
+    }
+
+
 class Firecrawl:
-    """Simple wrapper for Firecrawl SDK."""
+    """Async Firecrawl search client.
+
+    Uses a pooled aiohttp session against the Firecrawl REST API by default.
+    Set backend="sdk" (or FIRECRAWL_BACKEND=sdk) to fall back to the
+    synchronous Firecrawl SDK run in a thread pool.
+    """
+
+    def __init__(
+        self,
+        api_key: str = "",
+        api_url: Optional[str] = None,
+        backend: str = "http",
+        max_connections_per_host: int = 10,
+        cache: Optional[Cache] = None,
+    ):
+        if backend not in ("http", "sdk"):
+            raise ValueError(
+                f"Invalid Firecrawl backend '{backend}'. Choose from: http, sdk"
+            )
+
+        self.api_key = api_key
+        self.api_url = (api_url or DEFAULT_FIRECRAWL_URL).rstrip("/")
+        self.backend = backend
+        self.max_connections_per_host = max_connections_per_host
+        self.cache = cache
+        self.app = (
+            FirecrawlApp(api_key=api_key, api_url=api_url) if backend == "sdk" else None
+        )
+        self._session: Optional[aiohttp.ClientSession] = None
+
+    def _get_session(self) -> aiohttp.ClientSession:
+        """Get the shared HTTP session, creating it on first use."""
+        if self._session is None or self._session.closed:
+            connector = aiohttp.TCPConnector(
+                limit_per_host=self.max_connections_per_host,
+                keepalive_timeout=60,
+            )
+            self._session = aiohttp.ClientSession(
+                connector=connector,
+                headers={
+                    "Authorization": f"Bearer {self.api_key}",
+                    "Content-Type": "application/json",
+                },
+            )
+        return self._session
 
-    def __init__(self, api_key: str = "", api_url: Optional[str] = None):
-        self.app = FirecrawlApp(api_key=api_key, api_url=api_url)
+    async def close(self) -> None:
+        """Close the pooled HTTP session."""
+        if self._session is not None and not self._session.closed:
+            await self._session.close()
+        self._session = None
 
+    @traced("firecrawl.search")
     async def search(
         self, query: str, timeout: int = 15000, limit: int = 5
     ) -> SearchResponse:
-        """Search using Firecrawl SDK in a thread pool to keep it async."""
-        try:
-            # Run the synchronous SDK call in a thread pool
-            response = await asyncio.get_event_loop().run_in_executor(
-                None,
-                lambda: self.app.search(
-                    query=query,
-                ),
-            )
+        """Search Firecrawl and scrape markdown for each result.
+
+        Failed searches raise, so callers can tell them from searches that
+        found nothing.
+
+        Args:
+            query: Search query
+            timeout: Firecrawl scrape timeout in milliseconds
+            limit: Maximum number of results
+        """
+        span = current_span()
+        span.set(query=query, limit=limit, cached=False)
+        cache_key = make_key(
+            "firecrawl.search", self.api_url, " ".join(query.lower().split()), limit
+        )
+        if self.cache is not None:
+            cached = self.cache.get(cache_key)
+            if cached is not None:
+                span.set(cached=True, **_content_attributes(cached))
+                return cached
+
+        budget = current_budget()
+        if budget is not None:
+            budget.record_search()
 
-            # Handle the response format from the SDK
-            if isinstance(response, dict) and "data" in response:
-                # Response is already in the right format
-                return response
-            elif isinstance(response, dict) and "success" in response:
-                # Response is in the documented format
-                return {"data": response.get("data", [])}
-            elif isinstance(response, list):
-                # Response is a list of results
-                formatted_data = []
-                for item in response:
-                    if isinstance(item, dict):
-                        formatted_data.append(item)
-                    else:
-                        # Handle non-dict items (like objects)
-                        formatted_data.append(
-                            {
-                                "url": getattr(item, "url", ""),
-                                "markdown": getattr(item, "markdown", "")
-                                or getattr(item, "content", ""),
-                                "title": getattr(item, "title", "")
-                                or getattr(item, "metadata", {}).get("title", ""),
-                            }
-                        )
-                return {"data": formatted_data}
+        try:
+            if self.backend == "sdk":
+                response = await self._search_sdk(query)
             else:
-                print(f"Unexpected response format from Firecrawl: {type(response)}")
-                return {"data": []}
+                response = await self._search_http(query, timeout, limit)
+
+            result = self._format_response(response)
+            span.set(**_content_attributes(result))
+            # Only cache successful searches so failures are retried next run
+            if self.cache is not None and result["data"]:
+                self.cache.set(cache_key, result)
+            return result
 
         except Exception as e:
             print(f"Error searching with Firecrawl: {e}")
             print(
                 f"Response type: {type(response) if 'response' in locals() else 'N/A'}"
             )
+            raise
+
+    async def _search_http(self, query: str, timeout: int, limit: int) -> Any:
+        """Search using the Firecrawl REST API over the pooled session."""
+        payload = {
+            "query": query,
+            "limit": limit,
+            "timeout": timeout,
+            "scrapeOptions": {"formats": ["markdown"]},
+        }
+        # Give the API time to answer after its own scrape timeout expires
+        client_timeout = aiohttp.ClientTimeout(total=timeout / 1000 + 15)
+
+        async with self._get_session().post(
+            f"{self.api_url}/v1/search", json=payload, timeout=client_timeout
+        ) as response:
+            response.raise_for_status()
+            return await response.json()
+
+    async def _search_sdk(self, query: str) -> Any:
+        """Search using Firecrawl SDK in a thread pool to keep it async."""
+        # Run the synchronous SDK call in a thread pool
+        return await asyncio.get_event_loop().run_in_executor(
+            None,
+            lambda: self.app.search(
+                query=query,
+            ),
+        )
+
+    @staticmethod
+    def _format_response(response: Any) -> SearchResponse:
+        """Normalize the different Firecrawl response shapes."""
+        if isinstance(response, dict) and "data" in response:
+            # Response is already in the right format
+            return response
+        elif isinstance(response, dict) and "success" in response:
+            # Response is in the documented format
+            return {"data": response.get("data", [])}
+        elif isinstance(response, list):
+            # Response is a list of results
+            formatted_data = []
+            for item in response:
+                if isinstance(item, dict):
+                    formatted_data.append(item)
+                else:
+                    # Handle non-dict items (like objects)
+                    formatted_data.append(
+                        {
+                            "url": getattr(item, "url", ""),
+                            "markdown": getattr(item, "markdown", "")
+                            or getattr(item, "content", ""),
+                            "title": getattr(item, "title", "")
+                            or getattr(item, "metadata", {}).get("title", ""),
+                        }
+                    )
+            return {"data": formatted_data}
+        else:
+            print(f"Unexpected response format from Firecrawl: {type(response)}")
             return {"data": []}
 
 
@@ -84,15 +238,61 @@ class Firecrawl:
 firecrawl = Firecrawl(
     api_key=os.environ.get("FIRECRAWL_API_KEY", ""),
     api_url=os.environ.get("FIRECRAWL_BASE_URL"),
+    backend=os.environ.get("FIRECRAWL_BACKEND", "http").lower(),
+    max_connections_per_host=int(os.environ.get("FIRECRAWL_MAX_CONNECTIONS", "10")),
+    cache=SQLiteCache(
+        path=os.environ.get(
+            "SEARCH_CACHE_PATH", "~/.cache/deep_research_py/search.sqlite"
+        ),
+        ttl=float(os.environ.get("SEARCH_CACHE_TTL", str(24 * 60 * 60))),
+        max_bytes=int(os.environ.get("SEARCH_CACHE_MAX_MB", "256")) * 1024 * 1024,
+    )
+    if os.environ.get("SEARCH_CACHE", "1") != "0"
+    else None,
 )
 
 
+# Total tokens of search content sent with each process_serp_result call, at
+# most what the model's context leaves after the instructions and the answer
+SERP_TOKEN_BUDGET = int(os.environ.get("SERP_TOKEN_BUDGET", "25000"))
+CONTEXT_SIZE = int(os.environ.get("CONTEXT_SIZE", "128000"))
+
+# Room kept in the context for the learnings and follow-up questions
+SERP_RESPONSE_TOKENS = 1000
+
+# Learnings at least this similar (TF-IDF cosine) and citing the same numbers
+# are merged into one
+LEARNING_SIMILARITY_THRESHOLD = float(
+    os.environ.get("LEARNING_SIMILARITY_THRESHOLD", "0.85")
+)
+
+# Track visited URLs in a Bloom filter of this capacity instead of a set
+URL_INDEX_BLOOM_CAPACITY = int(os.environ.get("URL_INDEX_BLOOM_CAPACITY", "0")) or None
+
+# Learnings beyond this many tokens are written up as topic sections first
+REPORT_SECTION_TOKENS = int(os.environ.get("REPORT_SECTION_TOKENS", "30000"))
+
+# "full" expands every branch to the requested depth, "adaptive" expands the
+# most productive branches first and prunes those that stop producing
+RESEARCH_EXPLORATION = os.environ.get("RESEARCH_EXPLORATION", "full").lower()
+
+# Information gain a node needs for its branch to be explored further: one
+# per novel learning plus half the share of its search results at unseen URLs,
+# so new pages alone do not keep a branch going
+EXPLORATION_MIN_GAIN = float(os.environ.get("EXPLORATION_MIN_GAIN", "1.0"))
+UNSEEN_URL_GAIN = 0.5
+
+# Learnings sharing at least this share of word pairs are not novel
+NOVELTY_THRESHOLD = 0.5
+
+
 async def generate_serp_queries(
     query: str,
     client: openai.OpenAI,
     model: str,
     num_queries: int = 3,
     learnings: Optional[List[str]] = None,
+    started_at: Optional[datetime] = None,
 ) -> List[SerpQuery]:
     """Generate SERP queries based on user input and previous learnings."""
 
@@ -105,7 +305,7 @@ async def generate_serp_queries(
         client=client,
         model=model,
         messages=[
-            {"role": "system", "content": system_prompt()},
+            {"role": "system", "content": system_prompt(started_at=started_at)},
             {"role": "user", "content": prompt},
         ],
         response_format={"type": "json_object"},
@@ -127,32 +327,52 @@ async def process_serp_result(
     model: str,
     num_learnings: int = 3,
     num_follow_up_questions: int = 3,
+    token_budget: int = SERP_TOKEN_BUDGET,
+    started_at: Optional[datetime] = None,
 ) -> Dict[str, List[str]]:
-    """Process search results to extract learnings and follow-up questions."""
-
-    contents = [
-        trim_prompt(item.get("markdown", ""), 25_000)
-        for item in search_result["data"]
-        if item.get("markdown")
-    ]
+    """Process search results to extract learnings and follow-up questions.
 
-    # Create the contents string separately
-    contents_str = "".join(f"<content>\n{content}\n</content>" for content in contents)
+    The contents get token_budget tokens, or less if the instructions and the
+    answer would otherwise not fit in CONTEXT_SIZE.
+    """
 
-    prompt = (
+    markdowns = [
+        item["markdown"] for item in search_result["data"] if item.get("markdown")
+    ]
+    system = system_prompt(started_at=started_at)
+    instructions = (
         f"Given the following contents from a SERP search for the query <query>{query}</query>, "
         f"generate a list of learnings from the contents. Return a JSON object with 'learnings' "
         f"and 'followUpQuestions' keys with array of strings as values. Include up to {num_learnings} learnings and "
         f"{num_follow_up_questions} follow-up questions. The learnings should be unique, "
         "concise, and information-dense, including entities, metrics, numbers, and dates.\n\n"
-        f"<contents>{contents_str}</contents>"
     )
 
+    # The contents share the model's context with the instructions and the answer
+    overhead = SERP_RESPONSE_TOKENS + sum(
+        len(encoder.encode(text, disallowed_special=()))
+        for text in [system, instructions, "<contents></contents>"]
+        + ["<content>\n\n</content>"] * len(markdowns)
+    )
+    token_budget = max(0, min(token_budget, CONTEXT_SIZE - overhead))
+
+    # Share one token budget across all results, favouring relevant paragraphs
+    contents = pack_contents(
+        query=query,
+        documents=markdowns,
+        token_budget=token_budget,
+        encoding=encoder,
+    )
+
+    # Create the contents string separately
+    contents_str = "".join(f"<content>\n{content}\n</content>" for content in contents)
+    prompt = f"{instructions}<contents>{contents_str}</contents>"
+
     response = await get_client_response(
         client=client,
         model=model,
         messages=[
-            {"role": "system", "content": system_prompt()},
+            {"role": "system", "content": system},
             {"role": "user", "content": prompt},
         ],
         response_format={"type": "json_object"},
@@ -171,52 +391,266 @@ async def process_serp_result(
         return {"learnings": [], "followUpQuestions": []}
 
 
-async def write_final_report(
-    prompt: str,
-    learnings: List[str],
-    visited_urls: List[str],
-    client: openai.OpenAI,
-    model: str,
-) -> str:
-    """Generate final report based on all research learnings."""
-
+def _final_report_prompt(prompt: str, learnings: List[str], output: str) -> str:
+    """Build the report request; output says how the report should be returned."""
     learnings_string = trim_prompt(
         "\n".join([f"<learning>\n{learning}\n</learning>" for learning in learnings]),
         150_000,
     )
 
-    user_prompt = (
+    return (
         f"Given the following prompt from the user, write a final report on the topic using "
-        f"the learnings from research. Return a JSON object with a 'reportMarkdown' field "
-        f"containing a detailed markdown report (aim for 3+ pages). Include ALL the learnings "
+        f"the learnings from research. {output} Include ALL the learnings "
         f"from research:\n\n<prompt>{prompt}</prompt>\n\n"
         f"Here are all the learnings from research:\n\n<learnings>\n{learnings_string}\n</learnings>"
     )
 
+
+def _sources_section(visited_urls: List[str]) -> str:
+    return "\n\n## Sources\n\n" + "\n".join([f"- {url}" for url in visited_urls])
+
+
+def _skipped_section(skipped: Optional[List[str]]) -> str:
+    if not skipped:
+        return ""
+    return (
+        "\n\n## Research skipped\n\n"
+        "The run's budget ran out before the following could be researched:\n\n"
+        + "\n".join([f"- {item}" for item in skipped])
+    )
+
+
+def _topic_groups(learnings: List[str]) -> List[List[str]]:
+    """Split learnings into topic groups that each fit one section prompt."""
+    sizes = [
+        len(tokens) for tokens in encoder.encode_batch(learnings, disallowed_special=())
+    ]
+    return [
+        [learnings[i] for i in group]
+        for group in cluster_by_topic(learnings, sizes, REPORT_SECTION_TOKENS)
+    ]
+
+
+async def _write_sections(
+    prompt: str,
+    groups: List[List[str]],
+    client: openai.OpenAI,
+    model: str,
+    scheduler: ResearchScheduler,
+    started_at: Optional[datetime] = None,
+) -> List[str]:
+    """Draft one report section per topic group, concurrently."""
+
+    async def write_section(learnings: List[str]) -> str:
+        learnings_string = "\n".join(
+            [f"<learning>\n{learning}\n</learning>" for learning in learnings]
+        )
+        try:
+            async with scheduler.llm_slot():
+                response = await get_client_response(
+                    client=client,
+                    model=model,
+                    messages=[
+                        {
+                            "role": "system",
+                            "content": system_prompt(started_at=started_at),
+                        },
+                        {
+                            "role": "user",
+                            "content": (
+                                f"Given the following prompt from the user, write one section of a "
+                                f"larger research report, covering the topic shared by the learnings "
+                                f"below. Start with a '## ' heading naming the topic. Return a JSON "
+                                f"object with a 'sectionMarkdown' field containing a detailed markdown "
+                                f"section. Include ALL the learnings:\n\n<prompt>{prompt}</prompt>\n\n"
+                                f"<learnings>\n{learnings_string}\n</learnings>"
+                            ),
+                        },
+                    ],
+                    response_format={"type": "json_object"},
+                )
+            section = response.get("sectionMarkdown", "")
+        except Exception as e:
+            # Retries are exhausted or the request was rejected outright
+            print(f"Error generating report section: {e}")
+            section = ""
+
+        if not section:
+            # Never lose learnings because one section failed to generate
+            print("Error generating report section, listing its learnings instead")
+            section = "\n".join([f"- {learning}" for learning in learnings])
+        return section
+
+    return await asyncio.gather(*[write_section(group) for group in groups])
+
+
+def _synthesis_prompt(prompt: str, sections: List[str], output: str) -> str:
+    """Build the request for the title and summary that open a sectioned report."""
+    sections_string = trim_prompt(
+        "\n".join([f"<section>\n{section}\n</section>" for section in sections]),
+        150_000,
+    )
+
+    return (
+        f"Given the following prompt from the user and the sections of a research "
+        f"report, write the opening of the report: a '# ' title, an executive summary "
+        f"of the key findings and the conclusions that cut across sections. Do not "
+        f"repeat the sections themselves, they follow your text. {output}"
+        f"\n\n<prompt>{prompt}</prompt>\n\n<sections>\n{sections_string}\n</sections>"
+    )
+
+
+@traced("write_final_report")
+async def write_final_report(
+    prompt: str,
+    learnings: List[str],
+    visited_urls: List[str],
+    client: openai.OpenAI,
+    model: str,
+    scheduler: Optional[ResearchScheduler] = None,
+    skipped: Optional[List[str]] = None,
+    started_at: Optional[datetime] = None,
+) -> str:
+    """Generate final report based on all research learnings.
+
+    Learnings that do not fit one prompt are grouped by topic, each group is
+    written up as a section concurrently, and a final pass writes the title
+    and summary that open the report. Research skipped to stay within the
+    run's budget is listed before the sources.
+    """
+
+    groups = _topic_groups(learnings)
+    current_span().set(learnings=len(learnings), sections=len(groups))
+    if len(groups) > 1:
+        sections = await _write_sections(
+            prompt, groups, client, model, scheduler or ResearchScheduler(), started_at
+        )
+        user_prompt = _synthesis_prompt(
+            prompt,
+            sections,
+            "Return a JSON object with a 'reportMarkdown' field containing the "
+            "markdown opening.",
+        )
+    else:
+        sections = []
+        user_prompt = _final_report_prompt(
+            prompt,
+            learnings,
+            "Return a JSON object with a 'reportMarkdown' field containing a detailed "
+            "markdown report (aim for 3+ pages).",
+        )
+
     response = await get_client_response(
         client=client,
         model=model,
         messages=[
-            {"role": "system", "content": system_prompt()},
+            {"role": "system", "content": system_prompt(started_at=started_at)},
             {"role": "user", "content": user_prompt},
         ],
         response_format={"type": "json_object"},
     )
 
     try:
-        report = response.get("reportMarkdown", "")
+        report = "\n\n".join([response.get("reportMarkdown", ""), *sections])
 
-        # Append sources
-        urls_section = "\n\n## Sources\n\n" + "\n".join(
-            [f"- {url}" for url in visited_urls]
-        )
-        return report + urls_section
+        # Append what was not researched, then sources
+        return report + _skipped_section(skipped) + _sources_section(visited_urls)
     except json.JSONDecodeError as e:
         print(f"Error parsing JSON response: {e}")
         print(f"Raw response: {response}")
         return "Error generating report"
 
 
+async def stream_final_report(
+    prompt: str,
+    learnings: List[str],
+    visited_urls: List[str],
+    client: openai.OpenAI,
+    model: str,
+    scheduler: Optional[ResearchScheduler] = None,
+    skipped: Optional[List[str]] = None,
+    started_at: Optional[datetime] = None,
+) -> AsyncIterator[str]:
+    """Stream the final report as markdown while it is generated, then its sources.
+
+    Sectioned reports stream their opening once all sections are drafted.
+    """
+
+    groups = _topic_groups(learnings)
+    if len(groups) > 1:
+        sections = await _write_sections(
+            prompt, groups, client, model, scheduler or ResearchScheduler(), started_at
+        )
+        user_prompt = _synthesis_prompt(
+            prompt,
+            sections,
+            "Respond with only the markdown, without wrapping it in JSON or a code block.",
+        )
+    else:
+        sections = []
+        user_prompt = _final_report_prompt(
+            prompt,
+            learnings,
+            "Respond with only a detailed markdown report (aim for 3+ pages), "
+            "without wrapping it in JSON or a code block.",
+        )
+
+    async for chunk in stream_client_response(
+        client=client,
+        model=model,
+        messages=[
+            {"role": "system", "content": system_prompt(started_at=started_at)},
+            {"role": "user", "content": user_prompt},
+        ],
+    ):
+        yield chunk
+
+    for section in sections:
+        yield "\n\n" + section
+
+    yield _skipped_section(skipped)
+    yield _sources_section(visited_urls)
+
+
+@dataclass
+class ResearchNode:
+    """A SERP query in the research tree.
+
+    Nodes only hold their own learnings and point at their parent, so the
+    learnings along a branch are never copied into every descendant.
+    """
+
+    serp_query: SerpQuery
+    breadth: int
+    depth: int
+    path: NodePath
+    parent: Optional["ResearchNode"] = None
+    learnings: List[str] = field(default_factory=list)
+    # Information gain of the node once researched, see EXPLORATION_MIN_GAIN
+    gain: Optional[float] = None
+    # Whether adaptive exploration stopped at this node, and what of its
+    # follow-up research the budget left out
+    pruned: bool = False
+    skipped: List[str] = field(default_factory=list)
+
+    @property
+    def priority(self) -> float:
+        """Expected productivity, taken from the parent; unknown for the roots."""
+        if self.parent is None or self.parent.gain is None:
+            return math.inf
+        return self.parent.gain
+
+    def branch_learnings(self) -> List[str]:
+        """Learnings of this node and its ancestors, oldest first."""
+        chain = []
+        node: Optional[ResearchNode] = self
+        while node is not None:
+            chain.append(node.learnings)
+            node = node.parent
+        return [learning for learnings in reversed(chain) for learning in learnings]
+
+
+@traced("deep_research")
 async def deep_research(
     query: str,
     breadth: int,
@@ -226,100 +660,382 @@ async def deep_research(
     model: str,
     learnings: List[str] = None,
     visited_urls: List[str] = None,
+    scheduler: Optional[ResearchScheduler] = None,
+    on_progress: Optional[Callable[[str], None]] = None,
+    journal: Optional[ResearchJournal] = None,
+    budget: Optional[RunBudget] = None,
+    exploration: Optional[str] = None,
+    started_at: Optional[datetime] = None,
 ) -> ResearchResult:
     """
-    Main research function that recursively explores a topic.
+    Main research function that explores a topic breadth-first.
 
     Args:
         query: Research query/topic
         breadth: Number of parallel searches to perform
         depth: How many levels deep to research
+        concurrency: Default limit for both search and LLM calls
         learnings: Previous learnings to build upon
         visited_urls: Previously visited URLs
+        scheduler: Shared scheduler, created from concurrency if not given
+        on_progress: Called with a short message as each query is researched
+        journal: Records every finished query; queries it already holds from an
+            interrupted run are restored instead of researched again
+        budget: Limits on tokens, searches and time. As it runs low, fewer
+            follow-up queries are queued; once it is spent, queued queries are
+            skipped. Everything left out is listed in the result's skipped.
+        exploration: "full" (default, see RESEARCH_EXPLORATION) halves breadth
+            at every level down to depth. "adaptive" scores each query by the
+            novel learnings and unseen URLs it produced, researches the
+            children of the best-scoring queries first, narrows breadth to
+            the share of novel learnings and prunes branches that score below
+            EXPLORATION_MIN_GAIN.
+        started_at: Start of the run, the date in every prompt with
+            PROMPT_TIMESTAMP=run. Pass the same one to the report writer.
     """
+    exploration = (exploration or RESEARCH_EXPLORATION).lower()
+    if exploration not in ("full", "adaptive"):
+        raise ValueError(
+            f"Invalid exploration '{exploration}'. Choose from: full, adaptive"
+        )
+    adaptive = exploration == "adaptive"
+
     learnings = learnings or []
     visited_urls = visited_urls or []
+    scheduler = scheduler or ResearchScheduler(concurrency)
+    budget = budget or RunBudget()
+    budget.start()
+    started_at = started_at or datetime.now()
 
-    # Generate search queries
-    serp_queries = await generate_serp_queries(
-        query=query,
-        client=client,
-        model=model,
-        num_queries=breadth,
-        learnings=learnings,
-    )
+    # Generate search queries, unless an interrupted run already did
+    root_queries = journal.root_queries() if journal else None
+    if root_queries is not None:
+        serp_queries = [SerpQuery(**serp_query) for serp_query in root_queries]
+    else:
+        with budget.active():
+            async with scheduler.llm_slot():
+                serp_queries = await generate_serp_queries(
+                    query=query,
+                    client=client,
+                    model=model,
+                    num_queries=breadth,
+                    learnings=learnings,
+                    started_at=started_at,
+                )
+        if journal:
+            journal.record_queries([asdict(serp_query) for serp_query in serp_queries])
+
+    accumulator = ResearchAccumulator(learnings, visited_urls)
+    duplicate_index = NearDuplicateIndex()
+    url_index = UrlIndex(visited_urls, bloom_capacity=URL_INDEX_BLOOM_CAPACITY)
+    # Word-pair sketches of every learning so far, to tell novel ones apart.
+    # Only adaptive exploration scores nodes by their novel learnings.
+    learning_index: Optional[NearDuplicateIndex] = None
+    if adaptive:
+        learning_index = NearDuplicateIndex(threshold=NOVELTY_THRESHOLD, shingle_size=2)
+        for learning in learnings:
+            learning_index.add(learning, learning)
+    pruned: List[str] = []
+
+    def novel_learnings(new_learnings: List[str]) -> List[str]:
+        if learning_index is None:
+            return new_learnings
+        return [
+            learning
+            for learning in new_learnings
+            if learning_index.add(learning, learning) is None
+        ]
+
+    def child_nodes(
+        node: ResearchNode, serp_queries: List[SerpQuery]
+    ) -> List[ResearchNode]:
+        return [
+            ResearchNode(
+                serp_query=serp_query,
+                breadth=max(1, node.breadth // 2),
+                depth=node.depth - 1,
+                path=node.path + (index,),
+                parent=node,
+            )
+            for index, serp_query in enumerate(serp_queries)
+        ]
+
+    def journal_node(
+        node: ResearchNode,
+        urls: List[str],
+        pages: List[Dict[str, str]],
+        follow_up_questions: List[str],
+        children: List[SerpQuery],
+    ) -> None:
+        if journal:
+            journal.record_node(
+                node.path,
+                {
+                    "serp_query": asdict(node.serp_query),
+                    "urls": urls,
+                    "pages": pages,
+                    "learnings": node.learnings,
+                    "follow_up_questions": follow_up_questions,
+                    "children": [asdict(serp_query) for serp_query in children],
+                    "gain": node.gain,
+                    "pruned": node.pruned,
+                    "skipped": node.skipped,
+                    # Spending of the whole run so far, for a resumed budget
+                    "budget": budget.snapshot(),
+                },
+            )
+
+    def restore_node(node: ResearchNode, record: Dict[str, Any]) -> List[ResearchNode]:
+        """Replay a node finished by an interrupted run and return its children."""
+        node.learnings = record["learnings"]
+        node.gain = record.get("gain")
+        if record.get("pruned"):
+            pruned.append(node.serp_query.query)
+        for description in record.get("skipped", []):
+            budget.skip(description)
+        novel_learnings(node.learnings)
+        for url in record["urls"]:
+            url_index.add(url)
+        for page in record["pages"]:
+            if page.get("markdown"):
+                duplicate_index.add(page.get("url") or "", page["markdown"])
+        accumulator.record(
+            node.path,
+            learnings=node.learnings,
+            urls=record["urls"],
+            source_urls=[
+                page.get("url") for page in record["pages"] if page.get("url")
+            ],
+        )
+        return child_nodes(
+            node, [SerpQuery(**serp_query) for serp_query in record["children"]]
+        )
+
+    async def process_node(node: ResearchNode) -> List[ResearchNode]:
+        budget.pending -= 1
+        reason = budget.exhausted()
+        if reason:
+            budget.skip(f"{node.serp_query.query} ({reason})")
+            return []
 
-    # Create a semaphore to limit concurrent requests
-    semaphore = asyncio.Semaphore(concurrency)
+        with budget.active():
+            children = await research_node(node)
+        budget.nodes += 1
+        budget.pending += len(children)
+        return children
 
-    async def process_query(serp_query: SerpQuery) -> ResearchResult:
-        async with semaphore:
-            try:
-                # Search for content
+    async def research_node(node: ResearchNode) -> List[ResearchNode]:
+        serp_query = node.serp_query
+        current_span().set(query=serp_query.query, depth=node.depth)
+        # Pages claimed from the run-wide indexes but not yet processed
+        claimed: List[Dict[str, str]] = []
+        try:
+            # Search for content
+            async with scheduler.search_slot():
                 result = await firecrawl.search(
                     serp_query.query, timeout=15000, limit=5
                 )
 
-                # Collect new URLs
-                new_urls = [
-                    item.get("url") for item in result["data"] if item.get("url")
-                ]
+            # Collect new URLs
+            new_urls = [item.get("url") for item in result["data"] if item.get("url")]
+
+            # Skip pages another branch already processed, then syndicated
+            # copies and mirrors of pages seen this run
+            found = result["data"]
+            claimed = url_index.filter_new(found)
+            unseen_share = len(claimed) / len(found) if found else 0
+            result = {"data": await drop_near_duplicates(claimed, duplicate_index)}
+            if found and not result["data"]:
+                # Every page was seen before, so skip extraction and this branch
+                url_index.commit(claimed)
+                node.gain = 0.0
+                accumulator.record(node.path, urls=new_urls)
+                journal_node(node, new_urls, [], [], [])
+                return []
 
-                # Calculate new breadth and depth for next iteration
-                new_breadth = max(1, breadth // 2)
-                new_depth = depth - 1
+            # Calculate new breadth and depth for next iteration
+            new_breadth = max(1, node.breadth // 2)
+            new_depth = node.depth - 1
 
-                # Process the search results
+            # Process the search results
+            async with scheduler.llm_slot():
                 new_learnings = await process_serp_result(
                     query=serp_query.query,
                     search_result=result,
                     num_follow_up_questions=new_breadth,
                     client=client,
                     model=model,
+                    started_at=started_at,
                 )
+            # Only now are the pages processed, earlier failures release them
+            url_index.commit(claimed)
+            claimed = []
 
-                all_learnings = learnings + new_learnings["learnings"]
-                all_urls = visited_urls + new_urls
+            node.learnings = new_learnings["learnings"]
+            if adaptive:
+                novel = novel_learnings(node.learnings)
+                node.gain = len(novel) + UNSEEN_URL_GAIN * unseen_share
+                current_span().set(gain=node.gain)
+            accumulator.record(
+                node.path,
+                learnings=node.learnings,
+                urls=new_urls,
+                source_urls=[
+                    item.get("url") for item in result["data"] if item.get("url")
+                ],
+            )
+            if on_progress:
+                on_progress(
+                    f"Researched '{serp_query.query}': "
+                    f"{len(node.learnings)} learnings from {len(result['data'])} pages"
+                )
 
-                # If we have more depth to go, continue research
-                if new_depth > 0:
-                    print(
-                        f"Researching deeper, breadth: {new_breadth}, depth: {new_depth}"
+            if new_depth > 0 and adaptive:
+                if node.gain < EXPLORATION_MIN_GAIN:
+                    # This branch has stopped producing, go no deeper
+                    node.pruned = True
+                    pruned.append(serp_query.query)
+                    new_breadth = 0
+                elif node.learnings:
+                    # Follow as many directions as the share of novel learnings
+                    new_breadth = max(
+                        1, round(new_breadth * len(novel) / len(node.learnings))
                     )
 
-                    next_query = f"""
-                    Previous research goal: {serp_query.research_goal}
-                    Follow-up research directions: {" ".join(new_learnings["followUpQuestions"])}
-                    """.strip()
-
-                    return await deep_research(
-                        query=next_query,
-                        breadth=new_breadth,
-                        depth=new_depth,
-                        concurrency=concurrency,
-                        learnings=all_learnings,
-                        visited_urls=all_urls,
-                        client=client,
-                        model=model,
+            if new_depth > 0 and new_breadth > 0:
+                # Follow fewer directions, or none, as the budget runs low
+                affordable = budget.fit_breadth(new_breadth)
+                if affordable < new_breadth:
+                    node.skipped.append(
+                        f"{new_breadth - affordable} of {new_breadth} follow-up "
+                        f"directions of '{serp_query.query}'"
                     )
+                    budget.skip(node.skipped[-1])
+                    new_breadth = affordable
+
+            # If we have more depth to go, queue the next level
+            if new_depth <= 0 or new_breadth <= 0:
+                journal_node(
+                    node,
+                    new_urls,
+                    result["data"],
+                    new_learnings["followUpQuestions"],
+                    [],
+                )
+                return []
 
-                return {"learnings": all_learnings, "visited_urls": all_urls}
+            print(f"Researching deeper, breadth: {new_breadth}, depth: {new_depth}")
 
-            except Exception as e:
-                if "Timeout" in str(e):
-                    print(f"Timeout error running query: {serp_query.query}: {e}")
-                else:
-                    print(f"Error running query: {serp_query.query}: {e}")
-                return {"learnings": [], "visited_urls": []}
+            next_query = f"""
+            Previous research goal: {serp_query.research_goal}
+            Follow-up research directions: {" ".join(new_learnings["followUpQuestions"])}
+            """.strip()
+
+            async with scheduler.llm_slot():
+                next_serp_queries = await generate_serp_queries(
+                    query=next_query,
+                    client=client,
+                    model=model,
+                    num_queries=new_breadth,
+                    learnings=learnings + node.branch_learnings(),
+                    started_at=started_at,
+                )
 
-    # Process all queries concurrently
-    results = await asyncio.gather(*[process_query(query) for query in serp_queries])
+            journal_node(
+                node,
+                new_urls,
+                result["data"],
+                new_learnings["followUpQuestions"],
+                next_serp_queries,
+            )
+            return child_nodes(node, next_serp_queries)
 
-    # Combine all results
-    all_learnings = list(
-        set(learning for result in results for learning in result["learnings"])
+        except Exception as e:
+            if "Timeout" in str(e):
+                print(f"Timeout error running query: {serp_query.query}: {e}")
+            else:
+                print(f"Error running query: {serp_query.query}: {e}")
+            # Let another branch process the pages this one failed to
+            url_index.release(claimed)
+            forget_documents(claimed, duplicate_index)
+            return []
+
+    # Replay the nodes an interrupted run finished, leaving its frontier
+    completed = journal.completed_nodes() if journal else {}
+    frontier: List[ResearchNode] = []
+    nodes = [
+        ResearchNode(
+            serp_query=serp_query,
+            breadth=breadth,
+            depth=depth,
+            path=(index,),
+        )
+        for index, serp_query in enumerate(serp_queries)
+    ]
+    while nodes:
+        node = nodes.pop(0)
+        if node.path in completed:
+            nodes.extend(restore_node(node, completed[node.path]))
+        else:
+            frontier.append(node)
+    if completed:
+        # The latest record holds what the interrupted run had spent
+        spent = list(completed.values())[-1].get("budget")
+        if spent:
+            budget.restore(spent)
+        print(
+            f"Resuming with {len(completed)} finished queries, "
+            f"{len(frontier)} left to research"
+        )
+
+    # Process the whole tree through the shared scheduler, level by level or,
+    # when adaptive, the children of the most productive queries first
+    budget.pending += len(frontier)
+    await scheduler.run(
+        frontier,
+        process_node,
+        key=(lambda node: (-node.priority, -node.depth))
+        if adaptive
+        else (lambda node: -node.depth),
+        span_name="research.node",
     )
 
-    all_urls = list(set(url for result in results for url in result["visited_urls"]))
+    if url_index.skipped:
+        print(
+            f"Skipped {url_index.skipped} already processed pages "
+            f"({url_index.skipped_chars} characters)"
+        )
+    if duplicate_index.duplicates:
+        print(
+            f"Skipped {duplicate_index.duplicates} near-duplicate pages "
+            f"({duplicate_index.duplicate_chars} characters)"
+        )
+
+    # Collapse paraphrased learnings from different branches
+    all_learnings, learning_sources = merge_similar_learnings(
+        accumulator.learnings,
+        accumulator.learning_sources,
+        threshold=LEARNING_SIMILARITY_THRESHOLD,
+    )
 
-    return {"learnings": all_learnings, "visited_urls": all_urls}
+    if pruned:
+        print(f"Pruned {len(pruned)} branches that stopped producing new information")
+    if budget.limited:
+        print(f"Research budget: {budget.summary()}")
+    if budget.skipped:
+        print(f"Skipped {len(budget.skipped)} queries or directions to stay in budget")
+
+    current_span().set(
+        breadth=breadth,
+        depth=depth,
+        learnings=len(all_learnings),
+        visited_urls=len(accumulator.urls),
+        skipped=len(budget.skipped),
+        pruned=len(pruned),
+    )
+    return {
+        "learnings": all_learnings,
+        "visited_urls": accumulator.urls,
+        "learning_sources": learning_sources,
+        "skipped": budget.skipped,
+    }
@@ -0,0 +1,255 @@
+import asyncio
+import time
+import uuid
+from dataclasses import dataclass, field
+from enum import Enum
+from typing import Any, AsyncIterator, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from .cache import Cache
+
+
+class JobStatus(Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    DONE = "done"
+    FAILED = "failed"
+
+
+@dataclass
+class Job:
+    """A unit of background work and everything it has reported so far."""
+
+    id: str
+    status: JobStatus = JobStatus.QUEUED
+    events: List[str] = field(default_factory=list)
+    result: Optional[str] = None
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    finished_at: Optional[float] = None
+    _changed: asyncio.Event = field(default_factory=asyncio.Event, repr=False)
+    # Called on every change, e.g. to save the job to a shared store
+    _on_change: Optional[Callable[["Job"], None]] = field(default=None, repr=False)
+
+    @property
+    def finished(self) -> bool:
+        return self.status in (JobStatus.DONE, JobStatus.FAILED)
+
+    def report(self, event: str) -> None:
+        """Record a progress event and wake up anyone following the job."""
+        self.events.append(event)
+        self._notify()
+
+    def _notify(self) -> None:
+        self._changed.set()
+        self._changed = asyncio.Event()
+        if self._on_change is not None:
+            self._on_change(self)
+
+    async def follow(self, start: int = 0) -> AsyncIterator[str]:
+        """Yield the job's events from index start on, until it finishes."""
+        position = start
+        while True:
+            changed = self._changed
+            while position < len(self.events):
+                yield self.events[position]
+                position += 1
+            if self.finished:
+                return
+            await changed.wait()
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "id": self.id,
+            "status": self.status.value,
+            "events": list(self.events),
+            "result": self.result,
+            "error": self.error,
+            "created_at": self.created_at,
+            "finished_at": self.finished_at,
+        }
+
+    @classmethod
+    def from_dict(cls, data: Dict[str, Any]) -> "Job":
+        return cls(**{**data, "status": JobStatus(data["status"])})
+
+
+# Work run for a job; it reports progress through the job it is given
+JobFunction = Callable[[Job], Awaitable[str]]
+
+
+class JobManager:
+    """Runs submitted work on a fixed pool of background workers.
+
+    submit returns a job id right away; the job's status, progress events
+    and result can then be polled with get or followed as they happen.
+    Finished jobs are forgotten after ttl seconds.
+
+    With a store shared by several processes, every job is also saved there
+    under its id, at most every save_interval seconds while it runs, so any
+    process can report on a job that another one runs.
+    """
+
+    def __init__(
+        self,
+        max_workers: int = 2,
+        ttl: float = 3600,
+        store: Optional[Cache] = None,
+        save_interval: float = 1.0,
+    ):
+        if max_workers < 1:
+            raise ValueError("max_workers must be at least 1")
+        self.max_workers = max_workers
+        self.ttl = ttl
+        self.store = store
+        self.save_interval = save_interval
+        self._jobs: Dict[str, Job] = {}
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        # When each job was last saved to the store, and in what status
+        self._saved: Dict[str, Tuple[float, JobStatus]] = {}
+        self._pending_saves: Dict[str, asyncio.TimerHandle] = {}
+
+    def submit(self, func: JobFunction) -> str:
+        """Queue func to run in the background and return its job id."""
+        self._evict_expired()
+        if self._queue is None:
+            self._start()
+
+        job = Job(id=uuid.uuid4().hex)
+        self._jobs[job.id] = job
+        if self.store is not None:
+            job._on_change = self._save
+            self._save(job)
+        self._queue.put_nowait((job, func))
+        return job.id
+
+    def get(self, job_id: str) -> Optional[Job]:
+        """The job, or a snapshot of it from the store if another process runs it."""
+        job = self._jobs.get(job_id)
+        if job is None and self.store is not None and job_id:
+            data = self.store.get(self._key(job_id))
+            if data is not None:
+                job = Job.from_dict(data)
+        return job
+
+    async def follow(self, job_id: str, start: int = 0) -> AsyncIterator[str]:
+        """Yield a job's events from index start on, until it finishes.
+
+        Jobs run by another process are followed by polling the store.
+        """
+        job = self._jobs.get(job_id)
+        if job is not None:
+            async for event in job.follow(start):
+                yield event
+            return
+
+        position = start
+        while True:
+            job = self.get(job_id)
+            if job is None:
+                return
+            while position < len(job.events):
+                yield job.events[position]
+                position += 1
+            if job.finished:
+                return
+            await asyncio.sleep(self.save_interval)
+
+    def queue_position(self, job_id: str) -> int:
+        """Number of queued jobs submitted before this one."""
+        job = self._jobs.get(job_id)
+        if job is None or job.status != JobStatus.QUEUED:
+            return 0
+        return sum(
+            1
+            for other in self._jobs.values()
+            if other.status == JobStatus.QUEUED and other.created_at < job.created_at
+        )
+
+    @staticmethod
+    def _key(job_id: str) -> str:
+        return f"job:{job_id}"
+
+    def _save(self, job: Job) -> None:
+        """Save job to the store, unless it was saved moments ago in the same status.
+
+        A skipped save is made up for once save_interval has passed.
+        """
+        now = time.monotonic()
+        saved_at, saved_status = self._saved.get(job.id, (None, None))
+        if (
+            saved_at is not None
+            and saved_status == job.status
+            and now - saved_at < self.save_interval
+        ):
+            if job.id not in self._pending_saves:
+                self._pending_saves[job.id] = asyncio.get_running_loop().call_later(
+                    self.save_interval - (now - saved_at), self._save_pending, job
+                )
+            return
+
+        pending = self._pending_saves.pop(job.id, None)
+        if pending is not None:
+            pending.cancel()
+        try:
+            self.store.set(self._key(job.id), job.to_dict())
+            self._saved[job.id] = (now, job.status)
+        except Exception as e:
+            print(f"Error saving job {job.id}: {e}")
+
+    def _save_pending(self, job: Job) -> None:
+        self._pending_saves.pop(job.id, None)
+        self._saved.pop(job.id, None)
+        self._save(job)
+
+    def _start(self) -> None:
+        # Workers are started lazily so they belong to the serving event loop
+        self._queue = asyncio.Queue()
+        self._workers = [
+            asyncio.create_task(self._worker()) for _ in range(self.max_workers)
+        ]
+
+    async def _worker(self) -> None:
+        while True:
+            job, func = await self._queue.get()
+            job.status = JobStatus.RUNNING
+            job._notify()
+            try:
+                job.result = await func(job)
+                job.status = JobStatus.DONE
+            except Exception as e:
+                print(f"Error running job {job.id}: {e}")
+                job.error = str(e)
+                job.status = JobStatus.FAILED
+            finally:
+                job.finished_at = time.time()
+                job._notify()
+                self._queue.task_done()
+
+    def _evict_expired(self) -> None:
+        now = time.time()
+        for job_id in [
+            job_id
+            for job_id, job in self._jobs.items()
+            if job.finished_at is not None and now - job.finished_at > self.ttl
+        ]:
+            del self._jobs[job_id]
+            self._saved.pop(job_id, None)
+
+    async def close(self) -> None:
+        """Stop the workers, abandoning queued and running jobs."""
+        for task in self._workers:
+            task.cancel()
+        await asyncio.gather(*self._workers, return_exceptions=True)
+        # Other processes would otherwise wait for these jobs forever
+        for job in self._jobs.values():
+            if not job.finished:
+                job.error = "The server shut down before the job finished"
+                job.status = JobStatus.FAILED
+                job.finished_at = time.time()
+                job._notify()
+        for pending in self._pending_saves.values():
+            pending.cancel()
+        self._pending_saves.clear()
+        self._workers = []
+        self._queue = None
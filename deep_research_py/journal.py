@@ -0,0 +1,102 @@
+import json
+import os
+import uuid
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional
+
+from .accumulator import NodePath
+
+DEFAULT_JOURNAL_DIR = "~/.cache/deep_research_py/runs"
+
+
+class ResearchJournal:
+    """Append-only on-disk record of a research run, one JSON object per line.
+
+    The run's inputs, the generated SERP queries and every finished node are
+    written as soon as they are known, so an interrupted run can be resumed
+    without repeating completed searches and LLM calls. A line cut short by
+    a crash is ignored when the journal is read back.
+    """
+
+    def __init__(self, run_id: str, directory: Optional[str] = None):
+        self.run_id = run_id
+        directory = os.path.expanduser(
+            directory or os.getenv("RESEARCH_JOURNAL_DIR", DEFAULT_JOURNAL_DIR)
+        )
+        os.makedirs(directory, exist_ok=True)
+        self.path = os.path.join(directory, f"{run_id}.jsonl")
+
+    @classmethod
+    def create(cls, directory: Optional[str] = None) -> "ResearchJournal":
+        """Start a journal for a new run with a fresh, sortable run id."""
+        run_id = f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+        return cls(run_id, directory)
+
+    def exists(self) -> bool:
+        return os.path.exists(self.path)
+
+    def _append(self, record: Dict[str, Any]) -> None:
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(record) + "\n")
+            f.flush()
+
+    def _records(self) -> Iterator[Dict[str, Any]]:
+        if not self.exists():
+            return
+        with open(self.path, encoding="utf-8") as f:
+            for line in f:
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def start(
+        self,
+        query: str,
+        breadth: int,
+        depth: int,
+        started_at: Optional[datetime] = None,
+    ) -> None:
+        """Record the inputs of the run and when it started."""
+        self._append(
+            {
+                "type": "run",
+                "query": query,
+                "breadth": breadth,
+                "depth": depth,
+                "started_at": (started_at or datetime.now()).isoformat(),
+            }
+        )
+
+    def run_info(self) -> Optional[Dict[str, Any]]:
+        """The inputs the run was started with, if recorded."""
+        for record in self._records():
+            if record["type"] == "run":
+                return record
+        return None
+
+    def record_queries(self, queries: List[Dict[str, str]]) -> None:
+        """Record the top-level SERP queries of the run."""
+        self._append({"type": "queries", "queries": queries})
+
+    def root_queries(self) -> Optional[List[Dict[str, str]]]:
+        for record in self._records():
+            if record["type"] == "queries":
+                return record["queries"]
+        return None
+
+    def record_node(self, path: NodePath, node: Dict[str, Any]) -> None:
+        """Record everything a finished node produced.
+
+        node holds the node's SERP query, the search results it used, its
+        learnings, follow-up questions and the SERP queries of its children.
+        """
+        self._append({"type": "node", "path": list(path), **node})
+
+    def completed_nodes(self) -> Dict[NodePath, Dict[str, Any]]:
+        """Records of the finished nodes by path."""
+        return {
+            tuple(record["path"]): record
+            for record in self._records()
+            if record["type"] == "node"
+        }
@@ -1,10 +1,10 @@
+import os
 from datetime import datetime
+from typing import Optional
 
-
-def system_prompt() -> str:
-    """Creates the system prompt with current timestamp."""
-    now = datetime.now().isoformat()
-    return f"""You are an expert researcher. Today is {now}. Follow these instructions when responding:
+# Stable instructions come first so every request shares the same prefix and
+# provider-side prompt caching can hit.
+INSTRUCTIONS = """You are an expert researcher. Follow these instructions when responding:
     - You may be asked to research subjects that is after your knowledge cutoff, assume the user is right when presented with news.
     - The user is a highly experienced analyst, no need to simplify it, be as detailed as possible and make sure your response is correct.
     - Be highly organized.
@@ -17,3 +17,36 @@ def system_prompt() -> str:
     - Consider new technologies and contrarian ideas, not just the conventional wisdom.
     - You may use high levels of speculation or prediction, just flag it for me."""
 
+
+def system_prompt(
+    timestamp_mode: Optional[str] = None, started_at: Optional[datetime] = None
+) -> str:
+    """Creates the system prompt with the current date after the instructions.
+
+    Args:
+        timestamp_mode: "day" pins the date per calendar day, "run" pins the
+            timestamp to started_at, "exact" uses the current time at the start
+            of the prompt like older versions. Defaults to PROMPT_TIMESTAMP or "day".
+        started_at: Start of the research run, so every request in it shares
+            one timestamp. Defaults to now.
+    """
+    mode = (timestamp_mode or os.getenv("PROMPT_TIMESTAMP", "day")).lower()
+
+    if mode == "exact":
+        now = datetime.now().isoformat()
+        return INSTRUCTIONS.replace(
+            "You are an expert researcher.",
+            f"You are an expert researcher. Today is {now}.",
+            1,
+        )
+
+    if mode == "run":
+        today = (started_at or datetime.now()).replace(microsecond=0).isoformat()
+    elif mode == "day":
+        today = datetime.now().date().isoformat()
+    else:
+        raise ValueError(
+            f"Invalid timestamp mode '{mode}'. Choose from: day, run, exact"
+        )
+
+    return f"{INSTRUCTIONS}\n\nToday is {today}."
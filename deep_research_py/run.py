@@ -1,16 +1,30 @@
 import asyncio
 import typer
+from datetime import datetime
 from functools import wraps
+from typing import Optional, Tuple
+from openai import AsyncOpenAI
 from prompt_toolkit import PromptSession
 from rich.console import Console
 from rich.panel import Panel
+from rich.table import Table
 from rich.progress import Progress, SpinnerColumn, TextColumn
 from rich import print as rprint
 
-from deep_research_py.deep_research import deep_research, write_final_report
+from deep_research_py.deep_research import (
+    deep_research,
+    firecrawl,
+    stream_final_report,
+    write_final_report,
+)
+from deep_research_py.budget import RunBudget
 from deep_research_py.feedback import generate_feedback
+from deep_research_py.journal import ResearchJournal
+from deep_research_py.ai import providers
 from deep_research_py.ai.providers import AIClientFactory
 from deep_research_py.config import EnvironmentConfig
+from deep_research_py.scheduler import ResearchScheduler
+from deep_research_py.tracing import tracer
 
 app = typer.Typer()
 console = Console()
@@ -30,30 +44,8 @@ async def async_prompt(message: str, default: str = "") -> str:
     return await session.prompt_async(message)
 
 
-@app.command()
-@coro
-async def main(
-    concurrency: int = typer.Option(
-        default=2, help="Number of concurrent tasks, depending on your API rate limits."
-    ),
-):
-    """Deep Research CLI"""
-    console.print(
-        Panel.fit(
-            "[bold blue]Deep Research Assistant[/bold blue]\n"
-            "[dim]An AI-powered research tool[/dim]"
-        )
-    )
-
-    service = EnvironmentConfig.get_default_provider()
-
-    console.print(f"🛠️ Using [bold green]{service.upper()}[/bold green] service.")
-
-    client = AIClientFactory.get_client()
-
-    # Get the model for the current provider
-    model = AIClientFactory.get_model()
-
+async def ask_research_inputs(client: AsyncOpenAI, model: str) -> Tuple[str, int, int]:
+    """Ask for the topic, breadth, depth and answers to follow-up questions."""
     # Get initial inputs with clear formatting
     query = await async_prompt("\n🔍 What would you like to research? ")
     console.print()
@@ -86,6 +78,132 @@ async def main(
     {chr(10).join(f"Q: {q} A: {a}" for q, a in zip(follow_up_questions, answers))}
     """
 
+    return combined_query, breadth, depth
+
+
+def print_trace_summary() -> None:
+    """Show where the run spent its time and tokens, stage by stage."""
+    if not tracer.stats:
+        return
+
+    table = Table(title="Run summary", title_justify="left")
+    for column in (
+        "Stage",
+        "Calls",
+        "Errors",
+        "Total s",
+        "Mean ms",
+        "p95 ms",
+        "Wait s",
+        "Prompt tok",
+        "Cached tok",
+        "Output tok",
+        "Search KB",
+    ):
+        table.add_column(column, justify="left" if column == "Stage" else "right")
+
+    for name, stats in sorted(tracer.stats.items(), key=lambda item: -item[1].total):
+        table.add_row(
+            name,
+            str(stats.count),
+            str(stats.errors),
+            f"{stats.total:.2f}",
+            f"{stats.total / stats.count * 1000:.1f}",
+            f"{stats.p95 * 1000:.1f}",
+            f"{stats.wait:.2f}",
+            f"{stats.totals.get('prompt_tokens', 0):,.0f}",
+            f"{stats.totals.get('cached_tokens', 0):,.0f}",
+            f"{stats.totals.get('completion_tokens', 0):,.0f}",
+            f"{stats.totals.get('content_bytes', 0) / 1024:,.0f}",
+        )
+    console.print(table)
+
+
+@app.command()
+@coro
+async def main(
+    concurrency: int = typer.Option(
+        default=2,
+        envvar="RESEARCH_CONCURRENCY",
+        help="Number of concurrent tasks, depending on your API rate limits.",
+    ),
+    search_concurrency: Optional[int] = typer.Option(
+        default=None,
+        envvar="RESEARCH_SEARCH_CONCURRENCY",
+        help="Max in-flight Firecrawl searches (defaults to concurrency).",
+    ),
+    llm_concurrency: Optional[int] = typer.Option(
+        default=None,
+        envvar="RESEARCH_LLM_CONCURRENCY",
+        help="Max in-flight LLM calls (defaults to concurrency).",
+    ),
+    stream: bool = typer.Option(
+        default=False, help="Stream the final report to the terminal as it is written."
+    ),
+    resume: Optional[str] = typer.Option(
+        default=None, help="Run ID of an interrupted run to continue."
+    ),
+    max_input_tokens: Optional[int] = typer.Option(
+        default=None, help="Stop researching after this many prompt tokens."
+    ),
+    max_output_tokens: Optional[int] = typer.Option(
+        default=None, help="Stop researching after this many completion tokens."
+    ),
+    max_searches: Optional[int] = typer.Option(
+        default=None, help="Stop researching after this many Firecrawl searches."
+    ),
+    max_seconds: Optional[float] = typer.Option(
+        default=None, help="Stop researching after this many seconds."
+    ),
+    exploration: Optional[str] = typer.Option(
+        default=None,
+        help="'full' explores every branch to the full depth, 'adaptive' follows "
+        "the most productive branches and prunes the rest.",
+    ),
+):
+    """Deep Research CLI"""
+    console.print(
+        Panel.fit(
+            "[bold blue]Deep Research Assistant[/bold blue]\n"
+            "[dim]An AI-powered research tool[/dim]"
+        )
+    )
+
+    service = EnvironmentConfig.get_default_provider()
+
+    console.print(f"🛠️ Using [bold green]{service.upper()}[/bold green] service.")
+
+    client = AIClientFactory.get_client()
+
+    # Get the model for the current provider
+    model = AIClientFactory.get_model()
+
+    if resume:
+        journal = ResearchJournal(resume)
+        run_info = journal.run_info()
+        if run_info is None:
+            console.print(f"[red]No research run found with ID {resume}[/red]")
+            raise typer.Exit(1)
+        combined_query = run_info["query"]
+        breadth, depth = run_info["breadth"], run_info["depth"]
+        # Every prompt of the run, report included, is dated from its start
+        started_at = (
+            datetime.fromisoformat(run_info["started_at"])
+            if "started_at" in run_info
+            else datetime.now()
+        )
+        console.print(f"\n[yellow]Resuming research run {resume}...[/yellow]")
+    else:
+        combined_query, breadth, depth = await ask_research_inputs(client, model)
+        started_at = datetime.now()
+        journal = ResearchJournal.create()
+        journal.start(combined_query, breadth, depth, started_at=started_at)
+
+    console.print(
+        f"[dim]Run ID: {journal.run_id} (continue an interrupted run "
+        f"with --resume {journal.run_id})[/dim]"
+    )
+
     # Now use Progress for the research phase
     with Progress(
         SpinnerColumn(),
@@ -96,6 +214,10 @@ async def main(
         task = progress.add_task(
             "[yellow]Researching your topic...[/yellow]", total=None
         )
+        scheduler = ResearchScheduler(
+            search_concurrency=search_concurrency or concurrency,
+            llm_concurrency=llm_concurrency or concurrency,
+        )
         research_results = await deep_research(
             query=combined_query,
             breadth=breadth,
@@ -103,6 +225,16 @@ async def main(
             concurrency=concurrency,
             client=client,
             model=model,
+            scheduler=scheduler,
+            journal=journal,
+            budget=RunBudget.from_env(
+                max_input_tokens=max_input_tokens,
+                max_output_tokens=max_output_tokens,
+                max_search_calls=max_searches,
+                max_seconds=max_seconds,
+            ),
+            exploration=exploration,
+            started_at=started_at,
         )
         progress.remove_task(task)
 
@@ -111,16 +243,44 @@ async def main(
         for learning in research_results["learnings"]:
             rprint(f"• {learning}")
 
-        # Generate report
-        task = progress.add_task("Writing final report...", total=None)
-        report = await write_final_report(
-            prompt=combined_query,
-            learnings=research_results["learnings"],
-            visited_urls=research_results["visited_urls"],
-            client=client,
-            model=model,
-        )
-        progress.remove_task(task)
+    if stream:
+        # Write the report to the terminal and output.md as it is generated
+        console.print("\n[bold green]Research Complete![/bold green]")
+        console.print("\n[yellow]Final Report:[/yellow]\n")
+        with open("output.md", "w") as f:
+            async for chunk in stream_final_report(
+                prompt=combined_query,
+                learnings=research_results["learnings"],
+                visited_urls=research_results["visited_urls"],
+                client=client,
+                model=model,
+                scheduler=scheduler,
+                skipped=research_results.get("skipped"),
+                started_at=started_at,
+            ):
+                console.print(chunk, end="", markup=False, highlight=False)
+                f.write(chunk)
+                f.flush()
+        console.print("\n\n[dim]Report has been saved to output.md[/dim]")
+    else:
+        with Progress(
+            SpinnerColumn(),
+            TextColumn("[progress.description]{task.description}"),
+            console=console,
+        ) as progress:
+            # Generate report
+            task = progress.add_task("Writing final report...", total=None)
+            report = await write_final_report(
+                prompt=combined_query,
+                learnings=research_results["learnings"],
+                visited_urls=research_results["visited_urls"],
+                client=client,
+                model=model,
+                scheduler=scheduler,
+                skipped=research_results.get("skipped"),
+                started_at=started_at,
+            )
+            progress.remove_task(task)
 
         # Show results
         console.print("\n[bold green]Research Complete![/bold green]")
@@ -137,6 +297,29 @@ async def main(
             f.write(report)
         console.print("\n[dim]Report has been saved to output.md[/dim]")
 
+    for name, cache in (
+        ("Search", firecrawl.cache),
+        ("LLM", providers.response_cache),
+    ):
+        if cache is not None:
+            stats = cache.stats()
+            console.print(
+                f"[dim]{name} cache: {stats['hits']} hits, {stats['misses']} misses[/dim]"
+            )
+
+    usage = providers.token_usage
+    if usage.prompt_tokens:
+        console.print(
+            f"[dim]Prompt cache: {usage.cached_tokens} of {usage.prompt_tokens} "
+            f"prompt tokens cached ({usage.cache_hit_rate:.0%})[/dim]"
+        )
+
+    print_trace_summary()
+    tracer.close()
+
+    await firecrawl.close()
+    await AIClientFactory.close_clients()
+
 
 def run():
     """Synchronous entry point for the CLI tool."""
@@ -0,0 +1,97 @@
+import asyncio
+import itertools
+import time
+from contextlib import asynccontextmanager
+from typing import Any, AsyncIterator, Awaitable, Callable, Iterable, Optional
+
+from .tracing import current_span, tracer
+
+
+class ResearchScheduler:
+    """Shared concurrency limits and work queue for a whole research tree.
+
+    One scheduler is created per research run. Search and LLM calls each get
+    their own limit, so the number of in-flight requests never exceeds what
+    the provider rate limits allow, no matter how deep the tree grows.
+    """
+
+    def __init__(
+        self, search_concurrency: int = 2, llm_concurrency: Optional[int] = None
+    ):
+        llm_concurrency = llm_concurrency or search_concurrency
+        if search_concurrency < 1 or llm_concurrency < 1:
+            raise ValueError("Concurrency limits must be at least 1")
+
+        self.search_concurrency = search_concurrency
+        self.llm_concurrency = llm_concurrency
+        self._search_semaphore = asyncio.Semaphore(search_concurrency)
+        self._llm_semaphore = asyncio.Semaphore(llm_concurrency)
+
+    @asynccontextmanager
+    async def search_slot(self) -> AsyncIterator[None]:
+        """Hold one of the search slots for the duration of the block."""
+        started = time.perf_counter()
+        async with self._search_semaphore:
+            current_span().add("search_slot_wait", time.perf_counter() - started)
+            yield
+
+    @asynccontextmanager
+    async def llm_slot(self) -> AsyncIterator[None]:
+        """Hold one of the LLM slots for the duration of the block."""
+        started = time.perf_counter()
+        async with self._llm_semaphore:
+            current_span().add("llm_slot_wait", time.perf_counter() - started)
+            yield
+
+    @property
+    def worker_count(self) -> int:
+        """Enough workers to keep both the search and LLM slots busy."""
+        return self.search_concurrency + self.llm_concurrency
+
+    async def run(
+        self,
+        items: Iterable[Any],
+        handler: Callable[[Any], Awaitable[Iterable[Any]]],
+        key: Callable[[Any], Any],
+        span_name: str = "scheduler.item",
+    ) -> None:
+        """Drain a priority work queue with a fixed pool of workers.
+
+        Args:
+            items: Initial work items
+            handler: Processes one item and returns the new items it produced
+            key: Priority of an item, lowest is processed first
+            span_name: Name of the tracing span each item is handled in
+        """
+        queue: asyncio.PriorityQueue = asyncio.PriorityQueue()
+        # Tie-breaker keeps insertion order and avoids comparing the items
+        counter = itertools.count()
+
+        def put(item: Any) -> None:
+            queue.put_nowait((key(item), next(counter), time.perf_counter(), item))
+
+        for item in items:
+            put(item)
+
+        async def worker() -> None:
+            while True:
+                _, _, queued_at, item = await queue.get()
+                try:
+                    with tracer.span(
+                        span_name, queue_wait=time.perf_counter() - queued_at
+                    ):
+                        children = await handler(item)
+                    for child in children:
+                        put(child)
+                except Exception as e:
+                    print(f"Error processing research item: {e}")
+                finally:
+                    queue.task_done()
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.worker_count)]
+        try:
+            await queue.join()
+        finally:
+            for task in workers:
+                task.cancel()
+            await asyncio.gather(*workers, return_exceptions=True)
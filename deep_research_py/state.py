@@ -0,0 +1,62 @@
+import os
+from typing import Optional
+
+from .cache import Cache, MemoryCache, RedisCache, SQLiteCache, make_key
+
+
+def conversation_id(first_message: str) -> str:
+    """Stable ID for a conversation, the same in every process and restart."""
+    return make_key("conversation", first_message)
+
+
+def create_state_store(
+    backend: Optional[str] = None,
+    path: Optional[str] = None,
+    url: Optional[str] = None,
+    ttl: Optional[float] = None,
+    max_entries: Optional[int] = None,
+) -> Cache:
+    """Create the store for conversation state, configured from the environment.
+
+    Args:
+        backend: "memory" (LRU, this process only), "sqlite" (shared by the
+            processes of one machine) or "redis" (shared by all machines).
+            Defaults to STATE_STORE or "memory".
+        path: SQLite database path
+        url: Redis server URL
+        ttl: Seconds an idle conversation is kept
+        max_entries: Most conversations the memory backend keeps
+    """
+    backend = (backend or os.getenv("STATE_STORE", "memory")).lower()
+    if ttl is None:
+        ttl = float(os.getenv("STATE_STORE_TTL", str(24 * 60 * 60)))
+
+    if backend == "memory":
+        return MemoryCache(
+            ttl=ttl,
+            max_entries=max_entries
+            or int(os.getenv("STATE_STORE_MAX_ENTRIES", "10000")),
+        )
+    if backend == "sqlite":
+        return SQLiteCache(
+            path=path
+            or os.getenv("STATE_STORE_PATH", "~/.cache/deep_research_py/state.sqlite"),
+            ttl=ttl,
+        )
+    if backend == "redis":
+        try:
+            import redis
+        except ImportError:
+            raise ImportError(
+                "STATE_STORE=redis requires the redis package: pip install redis"
+            )
+        return RedisCache(
+            redis.Redis.from_url(
+                url or os.getenv("STATE_STORE_URL", "redis://localhost:6379/0")
+            ),
+            ttl=ttl,
+            prefix="deep_research_py:conversation:",
+        )
+    raise ValueError(
+        f"Invalid state store '{backend}'. Choose from: memory, sqlite, redis"
+    )
@@ -0,0 +1,307 @@
+import functools
+import inspect
+import json
+import math
+import os
+import random
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, Iterator, List, Optional, TypeVar
+
+F = TypeVar("F", bound=Callable[..., Any])
+
+# Numeric attributes that are totalled per stage in the summary
+SUMMARY_ATTRIBUTES = (
+    "prompt_tokens",
+    "completion_tokens",
+    "cached_tokens",
+    "content_bytes",
+)
+
+
+@dataclass
+class Span:
+    """One timed operation, nested under the span that was current when it began."""
+
+    name: str
+    trace_id: str
+    span_id: str
+    parent_id: Optional[str]
+    start_time: float
+    end_time: Optional[float] = None
+    attributes: Dict[str, Any] = field(default_factory=dict)
+    error: Optional[str] = None
+    _started: float = field(default_factory=time.perf_counter, repr=False)
+    _duration: Optional[float] = field(default=None, repr=False)
+
+    def set(self, **attributes: Any) -> None:
+        self.attributes.update(attributes)
+
+    def add(self, name: str, amount: float) -> None:
+        """Add to a numeric attribute, e.g. time spent waiting for a slot."""
+        self.attributes[name] = self.attributes.get(name, 0) + amount
+
+    @property
+    def duration(self) -> float:
+        """Seconds from start to end, or so far if the span is still open."""
+        if self._duration is not None:
+            return self._duration
+        return time.perf_counter() - self._started
+
+    @property
+    def wait(self) -> float:
+        """Seconds spent queued or throttled rather than doing work."""
+        return sum(
+            value for name, value in self.attributes.items() if name.endswith("_wait")
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "name": self.name,
+            "trace_id": self.trace_id,
+            "span_id": self.span_id,
+            "parent_id": self.parent_id,
+            "start_time": self.start_time,
+            "end_time": self.end_time,
+            "duration": self.duration,
+            "wait": self.wait,
+            "attributes": self.attributes,
+            "error": self.error,
+        }
+
+
+class _NullSpan:
+    """Stands in for the current span when there is none."""
+
+    def set(self, **attributes: Any) -> None:
+        pass
+
+    def add(self, name: str, amount: float) -> None:
+        pass
+
+
+_current_span: ContextVar[Optional[Span]] = ContextVar("current_span", default=None)
+
+
+def current_span() -> Any:
+    """The innermost open span of this task, or a no-op stand-in."""
+    return _current_span.get() or _NullSpan()
+
+
+class Exporter:
+    """Receives spans as they start and end."""
+
+    def on_start(self, span: Span) -> None:
+        pass
+
+    def on_end(self, span: Span) -> None:
+        pass
+
+    def close(self) -> None:
+        pass
+
+
+class JsonlExporter(Exporter):
+    """Writes every finished span to a file as one JSON object per line."""
+
+    def __init__(self, path: str):
+        self.path = os.path.expanduser(path)
+        self._file = open(self.path, "a", encoding="utf-8")
+        self._lock = threading.Lock()
+
+    def on_end(self, span: Span) -> None:
+        with self._lock:
+            self._file.write(json.dumps(span.to_dict(), default=str) + "\n")
+            self._file.flush()
+
+    def close(self) -> None:
+        with self._lock:
+            self._file.close()
+
+
+class OpenTelemetryExporter(Exporter):
+    """Mirrors spans into OpenTelemetry, for whatever exporter the SDK is set up with.
+
+    Requires the opentelemetry-api package; configure the SDK's tracer
+    provider and exporter (e.g. OTLP) as usual before the run starts.
+    """
+
+    def __init__(self):
+        try:
+            from opentelemetry import trace
+        except ImportError:
+            raise ImportError(
+                "TRACE=otel requires the opentelemetry-api package: "
+                "pip install opentelemetry-api opentelemetry-sdk"
+            )
+        self._trace = trace
+        self._tracer = trace.get_tracer("deep_research_py")
+        self._spans: Dict[str, Any] = {}
+
+    def on_start(self, span: Span) -> None:
+        parent = self._spans.get(span.parent_id) if span.parent_id else None
+        context = self._trace.set_span_in_context(parent) if parent else None
+        self._spans[span.span_id] = self._tracer.start_span(
+            span.name, context=context, start_time=int(span.start_time * 1e9)
+        )
+
+    def on_end(self, span: Span) -> None:
+        otel_span = self._spans.pop(span.span_id, None)
+        if otel_span is None:
+            return
+        for name, value in span.attributes.items():
+            if isinstance(value, (str, bool, int, float)):
+                otel_span.set_attribute(name, value)
+        if span.error:
+            otel_span.set_status(
+                self._trace.Status(self._trace.StatusCode.ERROR, span.error)
+            )
+        otel_span.end(end_time=int(span.end_time * 1e9))
+
+
+# Most span durations kept per stage for the p95
+DURATION_SAMPLE_SIZE = 1000
+
+
+@dataclass
+class StageStats:
+    """Totals over all finished spans of one name.
+
+    durations is a uniform sample of at most DURATION_SAMPLE_SIZE span
+    durations, so the stats of a long-lived process stay the same size.
+    """
+
+    count: int = 0
+    errors: int = 0
+    total: float = 0.0
+    durations: List[float] = field(default_factory=list)
+    wait: float = 0.0
+    totals: Dict[str, float] = field(default_factory=dict)
+    _random: random.Random = field(default_factory=lambda: random.Random(0), repr=False)
+
+    def add_duration(self, duration: float) -> None:
+        """Count one more span of this duration, sampling it by reservoir."""
+        self.count += 1
+        self.total += duration
+        if len(self.durations) < DURATION_SAMPLE_SIZE:
+            self.durations.append(duration)
+            return
+        index = self._random.randrange(self.count)
+        if index < DURATION_SAMPLE_SIZE:
+            self.durations[index] = duration
+
+    @property
+    def p95(self) -> float:
+        ordered = sorted(self.durations)
+        return ordered[max(0, math.ceil(len(ordered) * 0.95) - 1)] if ordered else 0.0
+
+
+class Tracer:
+    """Creates spans, hands them to the exporters and keeps per-stage totals."""
+
+    def __init__(self, exporters: Optional[List[Exporter]] = None):
+        self.exporters = exporters or []
+        self.stats: Dict[str, StageStats] = {}
+        self._lock = threading.Lock()
+
+    @contextmanager
+    def span(
+        self, name: str, activate: bool = True, **attributes: Any
+    ) -> Iterator[Span]:
+        """Time the enclosed block as a span.
+
+        With activate, spans opened inside the block become its children.
+        Pass activate=False inside generators, which must not leave a
+        different span current for their consumer.
+        """
+        parent = _current_span.get()
+        span = Span(
+            name=name,
+            trace_id=parent.trace_id if parent else uuid.uuid4().hex,
+            span_id=uuid.uuid4().hex[:16],
+            parent_id=parent.span_id if parent else None,
+            start_time=time.time(),
+            attributes=dict(attributes),
+        )
+        for exporter in self.exporters:
+            exporter.on_start(span)
+
+        token = _current_span.set(span) if activate else None
+        try:
+            yield span
+        except Exception as e:
+            span.error = f"{type(e).__name__}: {e}"
+            raise
+        finally:
+            if token is not None:
+                _current_span.reset(token)
+            span._duration = time.perf_counter() - span._started
+            span.end_time = span.start_time + span._duration
+            self._finish(span)
+
+    def _finish(self, span: Span) -> None:
+        with self._lock:
+            stats = self.stats.setdefault(span.name, StageStats())
+            stats.add_duration(span.duration)
+            stats.errors += 1 if span.error else 0
+            stats.wait += span.wait
+            for name in SUMMARY_ATTRIBUTES:
+                value = span.attributes.get(name)
+                if isinstance(value, (int, float)):
+                    stats.totals[name] = stats.totals.get(name, 0) + value
+        for exporter in self.exporters:
+            exporter.on_end(span)
+
+    def close(self) -> None:
+        for exporter in self.exporters:
+            exporter.close()
+
+
+def traced(name: str) -> Callable[[F], F]:
+    """Run every call of the decorated function or coroutine in a span."""
+
+    def decorator(func: F) -> F:
+        if inspect.iscoroutinefunction(func):
+
+            @functools.wraps(func)
+            async def async_wrapper(*args: Any, **kwargs: Any) -> Any:
+                with tracer.span(name):
+                    return await func(*args, **kwargs)
+
+            return async_wrapper  # type: ignore[return-value]
+
+        @functools.wraps(func)
+        def wrapper(*args: Any, **kwargs: Any) -> Any:
+            with tracer.span(name):
+                return func(*args, **kwargs)
+
+        return wrapper  # type: ignore[return-value]
+
+    return decorator
+
+
+def create_tracer(outputs: Optional[str] = None, path: Optional[str] = None) -> Tracer:
+    """Create a tracer exporting to outputs, a comma-separated list of "jsonl"
+    and "otel". Defaults to TRACE, and to TRACE_PATH for the JSONL file."""
+    outputs = outputs if outputs is not None else os.getenv("TRACE", "")
+    exporters: List[Exporter] = []
+    for output in filter(None, (o.strip().lower() for o in outputs.split(","))):
+        if output == "jsonl":
+            exporters.append(
+                JsonlExporter(path or os.getenv("TRACE_PATH", "trace.jsonl"))
+            )
+        elif output == "otel":
+            exporters.append(OpenTelemetryExporter())
+        else:
+            raise ValueError(
+                f"Invalid trace output '{output}'. Choose from: jsonl, otel"
+            )
+    return Tracer(exporters)
+
+
+# Shared by the whole process; per-stage totals are kept even without exporters
+tracer = create_tracer()
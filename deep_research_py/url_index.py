@@ -0,0 +1,121 @@
+import hashlib
+import math
+from typing import Dict, Iterable, List, Optional, Set
+from urllib.parse import parse_qsl, urlencode, urlsplit
+
+# Query parameters that only track the visitor and never change the page
+TRACKING_PARAMS = {"gclid", "fbclid", "msclkid", "mc_cid", "mc_eid", "ref", "ref_src"}
+
+
+def canonicalize_url(url: str) -> str:
+    """Normalize a URL so trivially different links to one page compare equal.
+
+    Drops the scheme, "www.", default ports, fragments, trailing slashes and
+    tracking parameters, lowercases the host and sorts the query string.
+    """
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or "").lower()
+    if host.startswith("www."):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path.rstrip("/")
+    query = urlencode(
+        sorted(
+            (key, value)
+            for key, value in parse_qsl(parts.query, keep_blank_values=True)
+            if not key.lower().startswith("utm_") and key.lower() not in TRACKING_PARAMS
+        )
+    )
+    return f"{host}{path}?{query}" if query else f"{host}{path}"
+
+
+class BloomFilter:
+    """Fixed-size probabilistic set: no false negatives, rare false positives."""
+
+    def __init__(self, capacity: int, error_rate: float = 0.001):
+        self.size = max(8, int(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.num_hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def _positions(self, item: str) -> Iterable[int]:
+        digest = hashlib.blake2b(item.encode("utf-8"), digest_size=16).digest()
+        h1 = int.from_bytes(digest[:8], "little")
+        h2 = int.from_bytes(digest[8:], "little") | 1
+        # Double hashing derives all k positions from two base hashes
+        return ((h1 + i * h2) % self.size for i in range(self.num_hashes))
+
+    def add(self, item: str) -> None:
+        for position in self._positions(item):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, item: str) -> bool:
+        return all(
+            self._bits[position >> 3] & (1 << (position & 7))
+            for position in self._positions(item)
+        )
+
+
+class UrlIndex:
+    """Run-wide index of canonical URLs that have already been processed.
+
+    Uses an exact set by default. Pass bloom_capacity to use a Bloom filter
+    with bounded memory for very large runs, at the cost of occasionally
+    skipping a page that was not actually seen.
+
+    URLs kept by filter_new are claimed while their pages are processed, so
+    no other branch picks them up meanwhile. commit records them once that
+    succeeded; release gives them back if it failed.
+    """
+
+    def __init__(self, urls: Iterable[str] = (), bloom_capacity: Optional[int] = None):
+        self._seen = BloomFilter(bloom_capacity) if bloom_capacity else set()
+        # Claimed by filter_new and not yet committed or released
+        self._pending: Set[str] = set()
+        self.skipped = 0
+        self.skipped_chars = 0
+        for url in urls:
+            self.add(url)
+
+    def add(self, url: str) -> bool:
+        """Record url, returning False if it was already in the index."""
+        key = canonicalize_url(url)
+        if key in self._seen:
+            return False
+        self._seen.add(key)
+        return True
+
+    def __contains__(self, url: str) -> bool:
+        key = canonicalize_url(url)
+        return key in self._seen or key in self._pending
+
+    def filter_new(self, items: List[Dict[str, str]]) -> List[Dict[str, str]]:
+        """Keep and claim the search results whose URL has not been processed yet."""
+        kept = []
+        for item in items:
+            url = item.get("url")
+            if not url:
+                kept.append(item)
+            elif url not in self:
+                self._pending.add(canonicalize_url(url))
+                kept.append(item)
+            else:
+                self.skipped += 1
+                self.skipped_chars += len(item.get("markdown") or "")
+        return kept
+
+    def commit(self, items: List[Dict[str, str]]) -> None:
+        """Record the claimed URLs of items as processed."""
+        for key in self._keys(items):
+            self._pending.discard(key)
+            self._seen.add(key)
+
+    def release(self, items: List[Dict[str, str]]) -> None:
+        """Give up the claimed URLs of items, so they can be processed again."""
+        for key in self._keys(items):
+            self._pending.discard(key)
+
+    @staticmethod
+    def _keys(items: List[Dict[str, str]]) -> List[str]:
+        return [canonicalize_url(item["url"]) for item in items if item.get("url")]
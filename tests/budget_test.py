@@ -0,0 +1,50 @@
+from deep_research_py.budget import DEFAULT_NODE_COST, RunBudget
+
+
+def test_unlimited_budget_never_runs_out():
+    budget = RunBudget()
+    budget.record_tokens(10**9, 10**9)
+    budget.nodes = 100
+
+    assert budget.exhausted() is None
+    assert budget.nodes_left() is None
+    assert budget.fit_breadth(4) == 4
+
+
+def test_exhausted_names_the_first_limit_reached():
+    budget = RunBudget(max_input_tokens=1000, max_search_calls=2)
+    budget.record_search()
+    assert budget.exhausted() is None
+
+    budget.record_search()
+    assert budget.exhausted() == "search calls budget of 2 reached"
+
+    budget.record_tokens(1000, 0)
+    assert budget.exhausted() == "input tokens budget of 1,000 reached"
+
+
+def test_nodes_left_uses_the_default_cost_before_the_first_node():
+    budget = RunBudget(max_search_calls=3)
+    budget.pending = 2
+
+    assert budget.nodes_left() == 3 // DEFAULT_NODE_COST["search calls"] - 2
+    assert budget.fit_breadth(4) == 1
+
+
+def test_nodes_left_uses_the_average_cost_of_finished_nodes():
+    budget = RunBudget(max_input_tokens=10_000, max_search_calls=100)
+    budget.record_tokens(2_000, 100)
+    budget.record_search()
+    budget.record_search()
+    budget.nodes = 2
+    budget.pending = 1
+
+    # 1,000 input tokens a node leaves room for 8 more, one already queued
+    assert budget.nodes_left() == 7
+    assert budget.fit_breadth(4) == 4
+    assert budget.fit_breadth(10) == 7
+
+    budget.record_tokens(7_500, 0)
+    budget.nodes = 3
+    assert budget.nodes_left() == 0
+    assert budget.fit_breadth(4) == 0
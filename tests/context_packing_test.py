@@ -0,0 +1,35 @@
+import pytest
+import tiktoken
+
+from benchmarks.stubs import FakeFirecrawlServer
+from deep_research_py.ai.context_packing import bm25_scores, pack_contents
+
+
+@pytest.mark.parametrize("token_budget", [0, 500, 2_000, 5_000])
+def test_packed_contents_stay_within_budget(token_budget):
+    encoding = tiktoken.get_encoding("cl100k_base")
+    server = FakeFirecrawlServer(page_size=10_000)
+    documents = [server.page("grid scale storage", index) for index in range(5)]
+
+    packed = pack_contents("grid storage", documents, token_budget, encoding)
+
+    tokens = sum(len(encoding.encode(content)) for content in packed)
+    assert tokens <= token_budget
+    assert bool(packed) == (token_budget > 0)
+
+
+def test_everything_fits_a_large_budget():
+    encoding = tiktoken.get_encoding("cl100k_base")
+    documents = ["First page.\n\nShared footer.", "Second page.\n\nShared footer."]
+
+    packed = pack_contents("page", documents, 10_000, encoding)
+
+    # The repeated footer is only kept on the page it first appeared on
+    assert packed == ["First page.\n\nShared footer.", "Second page."]
+
+
+def test_bm25_prefers_passages_with_the_query_terms():
+    scores = bm25_scores(
+        "sodium batteries", ["Sodium batteries are cheap.", "Lithium is light."]
+    )
+    assert scores[0] > scores[1] == 0
@@ -0,0 +1,74 @@
+from benchmarks.stubs import FakeFirecrawlServer
+from deep_research_py.dedup import (
+    NearDuplicateIndex,
+    drop_near_duplicates,
+    merge_similar_learnings,
+)
+
+PRICE_2023 = (
+    "Lithium-ion battery pack prices fell to $139/kWh in 2023, per BloombergNEF."
+)
+PRICE_2024 = (
+    "Lithium-ion battery pack prices fell to $115/kWh in 2024, per BloombergNEF."
+)
+
+
+def test_learnings_with_different_numbers_survive():
+    learnings = [
+        PRICE_2023,
+        PRICE_2024,
+        "Global grid storage capacity reached 45 GW in 2023.",
+        "Global grid storage capacity reached 45 GW in 2024.",
+    ]
+    merged, _ = merge_similar_learnings(learnings, threshold=0.5)
+    assert merged == learnings
+
+
+def test_paraphrases_merge():
+    paraphrase = (
+        "Per BloombergNEF, lithium-ion battery pack prices fell to $139/kWh in 2023."
+    )
+    learnings = [
+        PRICE_2023,
+        "Sodium-ion cells are entering mass production in China.",
+        paraphrase,
+        "Sodium-ion cells are now entering mass production in China.",
+    ]
+    sources = {
+        learning: [f"https://example.com/{i}"] for i, learning in enumerate(learnings)
+    }
+
+    merged, merged_sources = merge_similar_learnings(learnings, sources)
+
+    assert merged == [
+        PRICE_2023,
+        "Sodium-ion cells are now entering mass production in China.",
+    ]
+    assert merged_sources[PRICE_2023] == [
+        "https://example.com/0",
+        "https://example.com/2",
+    ]
+    assert merged_sources[merged[1]] == [
+        "https://example.com/1",
+        "https://example.com/3",
+    ]
+
+
+async def test_near_duplicate_pages_are_dropped():
+    server = FakeFirecrawlServer(page_size=5_000)
+    pages = [server.page("sodium-ion batteries", index) for index in range(20)]
+    mirror = pages[3].replace("# Sodium-Ion Batteries (3)", "# Mirror")
+    items = [
+        {"url": f"https://example.com/{index}", "markdown": page}
+        for index, page in enumerate(pages + [mirror])
+    ]
+    index = NearDuplicateIndex()
+
+    kept = await drop_near_duplicates(items, index)
+
+    assert kept == items[:-1]
+    assert index.duplicates == 1
+
+    index.remove("https://example.com/3")
+    assert index.add("https://example.com/mirror", mirror) is None
+    assert len(index) == 20
@@ -0,0 +1,76 @@
+from aiohttp import web
+
+from benchmarks.stubs import FakeFirecrawlServer, FakeOpenAIServer
+from deep_research_py import deep_research as pipeline
+from deep_research_py.ai import providers
+from deep_research_py.ai.providers import AIClientFactory
+from deep_research_py.budget import RunBudget
+from deep_research_py.deep_research import Firecrawl
+from deep_research_py.journal import ResearchJournal
+
+
+class RecordingFirecrawlServer(FakeFirecrawlServer):
+    """Fails every search after the first `succeed` and records the queries."""
+
+    def __init__(self, succeed: int):
+        super().__init__()
+        self.succeed = succeed
+        self.queries = []
+
+    async def _search(self, request: web.Request) -> web.Response:
+        self.queries.append((await request.json())["query"])
+        return await super()._search(request)
+
+    def _should_fail(self) -> bool:
+        self.requests += 1
+        return self.requests > self.succeed
+
+
+async def research(journal: ResearchJournal, succeed: int, budget: RunBudget):
+    search, llm = RecordingFirecrawlServer(succeed), FakeOpenAIServer()
+    firecrawl, cache = pipeline.firecrawl, providers.response_cache
+    providers.set_response_cache(None)
+    pipeline.firecrawl = Firecrawl(api_key="test", api_url=await search.start())
+    client = AIClientFactory.create_client("test", await llm.start())
+    try:
+        await pipeline.deep_research(
+            query="solid state batteries",
+            breadth=2,
+            depth=2,
+            concurrency=1,
+            client=client,
+            model="stub",
+            journal=journal,
+            budget=budget,
+        )
+    finally:
+        await pipeline.firecrawl.close()
+        await client.close()
+        await search.close()
+        await llm.close()
+        pipeline.firecrawl = firecrawl
+        providers.set_response_cache(cache)
+    return search.queries
+
+
+async def test_resume_researches_only_the_frontier(tmp_path):
+    journal = ResearchJournal.create(str(tmp_path))
+    journal.start("solid state batteries", 2, 2)
+
+    # The top-level searches succeed, every follow-up search fails
+    first = await research(journal, succeed=2, budget=RunBudget())
+    roots, follow_ups = first[:2], first[2:]
+    completed = journal.completed_nodes()
+    assert sorted(record["serp_query"]["query"] for record in completed.values()) == (
+        sorted(roots)
+    )
+    assert len(follow_ups) == 2
+
+    budget = RunBudget()
+    resumed = await research(journal, succeed=100, budget=budget)
+
+    assert sorted(resumed) == sorted(follow_ups)
+    assert len(journal.completed_nodes()) == 4
+    # Nodes of the interrupted run still count against the budget
+    assert budget.nodes == 4
+    assert "started_at" in journal.run_info()
@@ -0,0 +1,145 @@
+import time
+
+import pytest
+from openai import AsyncOpenAI
+
+from benchmarks.stubs import FakeOpenAIServer
+from deep_research_py.ai import providers
+from deep_research_py.ai.providers import AIClientFactory, get_client_response
+from deep_research_py.ai.rate_limit import (
+    RateLimiter,
+    backoff_delay,
+    get_rate_limiter,
+    parse_duration,
+    retry_after,
+)
+
+MESSAGES = [{"role": "user", "content": "Return the learnings as JSON."}]
+
+
+@pytest.fixture(autouse=True)
+def no_response_cache():
+    # Every request must reach the stub server
+    cache = providers.response_cache
+    providers.set_response_cache(None)
+    yield
+    providers.set_response_cache(cache)
+
+
+def make_client(server: FakeOpenAIServer, timeout: float = 5.0) -> AsyncOpenAI:
+    return AIClientFactory.create_client("test", server.base_url).with_options(
+        timeout=timeout
+    )
+
+
+async def ask(server: FakeOpenAIServer, timeout: float = 5.0) -> dict:
+    client = make_client(server, timeout)
+    try:
+        return await get_client_response(
+            client, "stub", MESSAGES, {"type": "json_object"}
+        )
+    finally:
+        await client.close()
+
+
+def test_parse_duration():
+    assert parse_duration("1.5") == 1.5
+    assert parse_duration("6m0s") == 360
+    assert parse_duration("20ms") == pytest.approx(0.02)
+    assert parse_duration("soon") is None
+
+
+def test_retry_after_headers():
+    assert retry_after({"retry-after-ms": "250"}) == 0.25
+    assert retry_after({"retry-after": "2"}) == 2
+    assert retry_after({}) is None
+    assert backoff_delay(3, {"retry-after": "120"}, maximum=60) == 60
+    assert 0 <= backoff_delay(2) <= 4
+
+
+def test_update_adopts_provider_limits():
+    limiter = RateLimiter()
+    limiter.update(
+        {
+            "x-ratelimit-limit-requests": "60",
+            "x-ratelimit-remaining-requests": "0",
+            "x-ratelimit-limit-tokens": "1000",
+            "x-ratelimit-remaining-tokens": "400",
+        }
+    )
+    assert limiter.requests.capacity == 60
+    assert limiter.requests.wait_time(1) == pytest.approx(1, abs=0.05)
+    assert limiter.tokens.capacity == 1000
+    assert limiter.tokens.wait_time(400) == 0
+    assert limiter.tokens.wait_time(500) > 0
+
+
+def test_update_keeps_lower_configured_limit():
+    limiter = RateLimiter(requests_per_minute=10)
+    limiter.update(
+        {"x-ratelimit-limit-requests": "500", "x-ratelimit-remaining-requests": "499"}
+    )
+    assert limiter.requests.capacity == 10
+
+
+def test_update_pauses_until_reset_without_limit():
+    limiter = RateLimiter()
+    limiter.update(
+        {"x-ratelimit-remaining-requests": "0", "x-ratelimit-reset-requests": "2s"}
+    )
+    assert limiter.requests is None
+    assert limiter._paused_until - time.monotonic() == pytest.approx(2, abs=0.1)
+
+
+async def test_retries_after_429_with_retry_after(capsys):
+    server = FakeOpenAIServer(faults=["429"])
+    await server.start()
+    try:
+        result = await ask(server)
+    finally:
+        await server.close()
+
+    assert result["learnings"]
+    assert server.requests == 2
+    assert server.rejected == 1
+    # The stub's Retry-After of 0.1s replaces the exponential backoff
+    assert "RateLimitError), retrying in 0.1s" in capsys.readouterr().out
+
+
+async def test_retries_malformed_json():
+    server = FakeOpenAIServer(faults=["malformed"])
+    await server.start()
+    try:
+        result = await ask(server)
+    finally:
+        await server.close()
+
+    assert result["learnings"]
+    assert server.requests == 2
+
+
+async def test_retries_timeout():
+    server = FakeOpenAIServer(faults=["timeout"], hang=2)
+    await server.start()
+    try:
+        result = await ask(server, timeout=0.3)
+    finally:
+        await server.close()
+
+    assert result["learnings"]
+    assert server.requests == 2
+
+
+async def test_limiter_syncs_with_server_headers():
+    server = FakeOpenAIServer(requests_per_minute=5)
+    await server.start()
+    client = make_client(server)
+    try:
+        await get_client_response(client, "stub", MESSAGES, {"type": "json_object"})
+    finally:
+        await client.close()
+        await server.close()
+
+    limiter = get_rate_limiter(str(client.base_url))
+    assert limiter.requests.capacity == 5
+    assert limiter.requests.available <= 4
@@ -0,0 +1,107 @@
+import random
+from typing import List
+
+import pytest
+import tiktoken
+
+from benchmarks.stubs import FakeFirecrawlServer
+from deep_research_py.ai.text_splitter import (
+    RecursiveCharacterTextSplitter,
+    TokenTextSplitter,
+)
+
+SEPARATORS = ["\n\n", "\n", ".", ",", ">", "<", " ", ""]
+
+
+def reference_merge(
+    splits: List[str], separator: str, chunk_size: int, chunk_overlap: int
+) -> List[str]:
+    """merge_splits as originally written, with a list as the window."""
+    docs: List[str] = []
+    current_doc: List[str] = []
+    total = 0
+    for d in splits:
+        if total + len(d) >= chunk_size:
+            if current_doc:
+                doc = separator.join(current_doc).strip()
+                if doc:
+                    docs.append(doc)
+                while total > chunk_overlap or (
+                    total + len(d) > chunk_size and total > 0
+                ):
+                    total -= len(current_doc.pop(0))
+        current_doc.append(d)
+        total += len(d)
+    doc = separator.join(current_doc).strip()
+    if doc:
+        docs.append(doc)
+    return docs
+
+
+def reference_split(text: str, chunk_size: int, chunk_overlap: int) -> List[str]:
+    """The recursive split_text the iterative splitter replaced."""
+    separator = next(s for s in SEPARATORS if s == "" or s in text)
+    splits = text.split(separator) if separator else list(text)
+
+    chunks: List[str] = []
+    good_splits: List[str] = []
+    for s in splits:
+        if len(s) < chunk_size:
+            good_splits.append(s)
+            continue
+        if good_splits:
+            chunks.extend(
+                reference_merge(good_splits, separator, chunk_size, chunk_overlap)
+            )
+            good_splits = []
+        chunks.extend(reference_split(s, chunk_size, chunk_overlap))
+    if good_splits:
+        chunks.extend(
+            reference_merge(good_splits, separator, chunk_size, chunk_overlap)
+        )
+    return chunks
+
+
+def random_text(rng: random.Random) -> str:
+    """Words, punctuation and unbroken runs, so every separator gets used."""
+    pieces = []
+    for _ in range(rng.randint(0, 400)):
+        roll = rng.random()
+        if roll < 0.05:
+            pieces.append("x" * rng.randint(1, 300))
+        elif roll < 0.1:
+            pieces.append(rng.choice(["\n\n", "\n", ". ", ", ", "<b>", " "]))
+        else:
+            pieces.append(
+                "".join(rng.choice("abcdefg") for _ in range(rng.randint(1, 12)))
+            )
+        pieces.append(rng.choice([" ", " ", " ", "", ".", ",", "\n"]))
+    return "".join(pieces)
+
+
+@pytest.mark.parametrize("seed", range(40))
+def test_splitter_matches_recursive_reference(seed):
+    rng = random.Random(seed)
+    chunk_size = rng.choice([10, 50, 100, 400, 1000])
+    chunk_overlap = rng.randint(0, chunk_size - 1)
+    splitter = RecursiveCharacterTextSplitter(chunk_size, chunk_overlap)
+    text = random_text(rng)
+
+    assert splitter.split_text(text) == reference_split(text, chunk_size, chunk_overlap)
+
+
+def test_token_splitter_cuts_at_token_offsets():
+    encoding = tiktoken.get_encoding("cl100k_base")
+    server = FakeFirecrawlServer(page_size=3_000)
+    texts = [server.page("perovskite solar cells", index) for index in range(3)]
+    texts.append("Short text, a single chunk.")
+    splitter = TokenTextSplitter(chunk_size=100, chunk_overlap=0, encoding=encoding)
+
+    batches = splitter.split_texts(texts)
+
+    assert batches[-1] == [texts[-1]]
+    for text, chunks in zip(texts, batches):
+        tokens = len(encoding.encode(text, disallowed_special=()))
+        assert "".join(chunks) == text
+        assert len(chunks) == -(-tokens // 100)
+    assert splitter.split_text(texts[0]) == batches[0]
@@ -0,0 +1,60 @@
+import pytest
+
+from deep_research_py.url_index import UrlIndex, canonicalize_url
+
+
+@pytest.mark.parametrize(
+    "url",
+    [
+        "https://www.Example.com/guide/",
+        "http://example.com/guide#install",
+        "https://example.com:443/guide?utm_source=news&fbclid=abc",
+    ],
+)
+def test_canonicalize_url_drops_cosmetic_differences(url):
+    assert canonicalize_url(url) == "example.com/guide"
+
+
+def test_canonicalize_url_keeps_meaningful_parts():
+    assert canonicalize_url("https://example.com/guide?b=2&a=1") == (
+        "example.com/guide?a=1&b=2"
+    )
+    assert canonicalize_url("https://example.com:8080/guide") == (
+        "example.com:8080/guide"
+    )
+    assert canonicalize_url("https://example.com/guide?page=2") != (
+        canonicalize_url("https://example.com/guide?page=3")
+    )
+
+
+def page(url: str) -> dict:
+    return {"url": url, "markdown": "# Page"}
+
+
+@pytest.mark.parametrize("bloom_capacity", [None, 1000])
+def test_claimed_urls_are_skipped_until_released(bloom_capacity):
+    index = UrlIndex(["https://example.com/seen"], bloom_capacity=bloom_capacity)
+    items = [page("https://example.com/seen"), page("https://example.com/new"), {}]
+
+    claimed = index.filter_new(items)
+    assert claimed == items[1:]
+    assert index.skipped == 1 and index.skipped_chars == len("# Page")
+
+    # Another branch finds the same page while the first one processes it
+    assert index.filter_new([page("https://www.example.com/new/")]) == []
+
+    index.release(claimed)
+    assert "https://example.com/new" not in index
+    assert index.filter_new([page("https://example.com/new")]) == [items[1]]
+
+
+def test_committed_urls_stay_seen():
+    index = UrlIndex()
+    claimed = index.filter_new([page("https://example.com/a")])
+
+    index.commit(claimed)
+    index.release(claimed)
+
+    assert "https://example.com/a" in index
+    assert index.add("https://example.com/a") is False
+    assert index.filter_new([page("https://example.com/a#top")]) == []